@@ -6,18 +6,25 @@ __license__ = None
 __copyright__ = 'Copyright 2021-present DCx7c5'
 __version__ = '0.1.0'
 
-from asyncio import set_event_loop_policy
-from uvloop import EventLoopPolicy
-from collections import namedtuple
+from typing import NamedTuple, Optional
 import logging
 
-set_event_loop_policy(EventLoopPolicy())
+from uvloop import run
+
+
+class VersionInfo(NamedTuple):
+    major: int
+    minor: int
+    micro: int
+    releaselevel: Optional[str]
+    serial: int
 
-VersionInfo = namedtuple('VersionInfo', 'major minor micro releaselevel serial')
 
 version_info = VersionInfo(major=0, minor=1, micro=0, releaselevel=None, serial=0)
 
 logging.getLogger(__name__).addHandler(logging.NullHandler())
 
-logging.basicConfig(level=logging.INFO)
 
+def setup_logging(level: int = logging.INFO) -> None:
+    """Configures root logging for applications that don't set up their own."""
+    logging.basicConfig(level=level)
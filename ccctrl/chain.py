@@ -1,3 +1,6 @@
+from typing import Union
+from weakref import WeakValueDictionary
+
 from core.types import (
     BHeightType,
     BlockHash,
@@ -7,10 +10,13 @@ from core.types import (
 class Block:
     best_block_height: BHeightType = 0
 
-    __slots__ = ('_hash', 'height', 'time', 'mediantime')
+    # Blocks that are still referenced somewhere, keyed by their raw hash
+    _intern: "WeakValueDictionary[bytes, Block]" = WeakValueDictionary()
+
+    __slots__ = ('_hash', 'height', 'time', 'mediantime', '__weakref__')
 
-    def __init__(self, bl_hash, height, **data):
-        self._hash: BlockHash = bl_hash
+    def __init__(self, bl_hash: Union[BlockHash, bytes], height, **data):
+        self._hash: bytes = bytes.fromhex(bl_hash) if isinstance(bl_hash, str) else bl_hash
         self.height: BHeightType = height
         self.time: int = data.get('time')
         self.mediantime: int = data.get('mediantime')
@@ -19,17 +25,28 @@ class Block:
             Block.best_block_height = height
 
     @classmethod
-    async def create_block(cls, block_hash: str, height: int, **data) -> "Block":
+    async def create_block(cls, block_hash: BlockHash, height: int, **data) -> "Block":
+        raw_hash = bytes.fromhex(block_hash)
+        block = cls._intern.get(raw_hash)
+        if block is None:
+            block = cls(raw_hash, height, **data)
+            cls._intern[raw_hash] = block
+        return block
 
-        cls._hash = block_hash
-        cls.height = height
-        return b
+    @property
+    def hash(self) -> BlockHash:
+        return self._hash.hex()
+
+    def __eq__(self, other):
+        return isinstance(other, Block) and other._hash == self._hash
 
     def __hash__(self):
-        return self._hash
+        # The hex form is displayed big endian, its leading bytes are the zeros
+        # from proof of work, so the trailing bytes are the ones worth hashing.
+        return int.from_bytes(self._hash[-8:], 'little')
 
     def __repr__(self):
-        return f'<Block {self.count} {hash(self)}>'
+        return f'<Block {self.height} {self.hash}>'
 
 
 class Tx:
@@ -37,4 +54,3 @@ class Tx:
     @classmethod
     async def create_tx(cls):
         return cls()
-
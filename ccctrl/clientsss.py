@@ -1,23 +1,47 @@
 
 
+import os
+import re
+import signal
+from itertools import cycle
 from asyncio.tasks import sleep
 from enum import Enum
 from subprocess import run
 from logging import getLogger
-from aiohttp import ClientSession as ClientHttpSession
+from operator import itemgetter
+from aiohttp import ClientSession as ClientHttpSession, BasicAuth, TCPConnector
+import orjson
 from bitcoinrpc import BitcoinRPC
 from bitcoinrpc.bitcoin_rpc import RPCError
 
 
-from secrets import randbelow, choice
-from string import ascii_letters, digits
+from secrets import randbelow, token_urlsafe
 from typing import (Optional, Union, List, Dict, Iterable, Tuple)
-from asyncio import (get_event_loop, create_subprocess_shell, subprocess)
+from asyncio import (get_running_loop, create_subprocess_exec, subprocess)
 
 from multidict import CIMultiDict
 
+from core.errors import (
+    rpc_error_lookup_table,
+    RPCException,
+    error_handler,
+)
+from core.utils import (
+    LRUCache,
+)
+
 log = getLogger(__name__)
 
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+RPC_CACHE_SIZE = int(os.environ.get('CCCTRL_RPC_CACHE_SIZE', 50_000))
+
+# Blocks with fewer confirmations may still be reorganized away
+BLOCK_CACHE_MIN_CONFIRMATIONS = 6
+
+# First node version whose listreceivedbyaddress takes an address_filter
+ADDRESS_FILTER_MIN_VERSION = 210000
+
 
 __all_commands__ = (
     'stop',
@@ -53,6 +77,35 @@ __all_commands__ = (
 )
 
 
+# RpcClient methods whose arguments are passed to the rpc command unchanged,
+# generated once below the class definition.
+__passthrough_commands__ = {
+    'stop': 'stop',
+    'move': 'move',
+    'get_info': '-getinfo',
+    'get_network_info': 'getnetworkinfo',
+    'get_difficulty': 'getdifficulty',
+    'get_net_totals': 'getnettotals',
+    'get_connection_count': 'getconnectioncount',
+    'get_network_hash_ps': 'getnetworkhashps',
+    'get_mining_info': 'getmininginfo',
+    'get_peer_info': 'getpeerinfo',
+    'get_chain_tips': 'getchaintips',
+    'get_chain_tx_stats': 'getchaintxstats',
+    'get_wallet_info': 'getwalletinfo',
+    'get_blockchain_info': 'getblockchaininfo',
+    'get_new_address': 'getnewaddress',
+    'get_account_address': 'getaccountaddress',
+    'get_addresses_by_account': 'getaddressesbyaccount',
+    'get_block_count': 'getblockcount',
+    'get_transaction': 'gettransaction',
+    'send_from': 'sendfrom',
+    'send_to_address': 'sendtoaddress',
+    'list_accounts': 'listaccounts',
+    'list_received_by_address': 'listreceivedbyaddress',
+}
+
+
 class TransactionType(Enum):
     INT_FROM = 0
     INT_TO = 1
@@ -77,14 +130,17 @@ async def is_address_type(addr: "Address", client: "WalletClient"):
     return await client.validate_address(addr)
 
 
-async def exec_subprocess(cmd):
-    proc = await create_subprocess_shell(
-        cmd=cmd,
+async def exec_subprocess(*argv: str):
+    proc = await create_subprocess_exec(
+        *argv,
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE)
     return await proc.communicate()
 
 
+_match_address_format = re.compile(r'N[0-9A-Za-z]{33}').fullmatch
+
+
 class Address:
     __slots__ = ('address', 'client')
 
@@ -113,7 +169,7 @@ class Address:
 
     @staticmethod
     async def is_address_format(arg: Union[str, "Address"]):
-        return arg.isalnum() and arg.startswith('N') and len(arg) == 34
+        return _match_address_format(str(arg)) is not None
 
     @classmethod
     async def from_string(cls, addr, cli=None) -> "Address":
@@ -148,21 +204,56 @@ class Tx:
         return cls()
 
 
+class RpcPipeline:
+    """Queues ``(method, params)`` calls and sends them as one JSON-RPC batch on exit.
+
+    Results are available in call order via :attr:`results` after the block.
+    """
+    __slots__ = ('client', 'calls', 'results')
+
+    def __init__(self, client: "RpcClient"):
+        self.client = client
+        self.calls: List[Tuple[str, list]] = []
+        self.results: list = []
+
+    def call(self, method: str, params: Optional[list] = None) -> int:
+        self.calls.append((method, params if params is not None else []))
+        return len(self.calls) - 1
+
+    async def __aenter__(self) -> "RpcPipeline":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None and self.calls:
+            self.results = await self.client.batch_call(*self.calls)
+
+
 class RpcClient:
 
     def __init__(self, name: str, symbol: str, binary: str,
                  host: str = '127.0.0.1', port: int = 8332,
                  loop=None, bot=None):
         self.rpc = None
+        self._rpc_pool: List[BitcoinRPC] = []
+        self._next_rpc = None
+        self._rpc_threads = 12
         self.http = None
         self._binary = binary
         self.coin_name = name
         self.symbol = symbol
-        self.loop = loop or get_event_loop()
+        self.loop = loop or get_running_loop()
         self.host, self.port = host, port
         self._confl = [host, port]
         self._confp = None
+        self._data_dir = None
+        self._argv_base: Optional[List[str]] = None
         self._bot = bot
+        self._rpc_url = f'http://{host}:{port}'
+        # Per client, so a cached lookup never keeps a client alive
+        self._block_cache = LRUCache(RPC_CACHE_SIZE)
+        self._address_cache = LRUCache(RPC_CACHE_SIZE)
+        self._account_cache = LRUCache(RPC_CACHE_SIZE)
+        self._address_filter: Optional[bool] = None
 
     async def start_daemon_async(self,
                                  u: Optional[str] = None,
@@ -170,23 +261,28 @@ class RpcClient:
                                  daemon: bool = True,
                                  rpc_threads: int = 12):
         self._confl, self._confp = [self.host, self.port], None
+        self._rpc_threads = rpc_threads
         _user = u or f'{self.symbol.lower()}_user_{randbelow(1000)}'
-        _pass = pw or f"{''.join(choice(ascii_letters + digits) for _ in range(64))}"
+        _pass = pw or token_urlsafe(48)
 
-        _confp = f'-rpcuser={_user} ' \
-                 f'-rpcpassword={_pass} ' \
-                 f'-rpcallowip={self._confl[0]} ' \
-                 f'-rpcport={self._confl[1]} ' \
-                 f"-listen=0 " \
-                 f'-logips=1 '
+        _confp = [
+            f'-rpcuser={_user}',
+            f'-rpcpassword={_pass}',
+            f'-rpcallowip={self._confl[0]}',
+            f'-rpcport={self._confl[1]}',
+        ]
 
         log.debug(f"{_user, _pass, _confp}")
-        cmd = f"{self._binary} " \
-              f"{'--daemon' if daemon else ''} " \
-              f"-rpcthreads={rpc_threads} " \
-              f"-datadir={root_dir}/.wallets/{self.symbol} " + _confp
+        if self._argv_base is None:
+            self._data_dir = f'{root_dir}/.wallets/{self.symbol}'
+            self._argv_base = [self._binary, f'-datadir={self._data_dir}', '-listen=0', '-logips=1']
 
-        stdout, stderr = await exec_subprocess(cmd)
+        argv = self._argv_base + _confp
+        argv.append(f'-rpcthreads={rpc_threads}')
+        if daemon:
+            argv.append('--daemon')
+
+        stdout, stderr = await exec_subprocess(*argv)
 
         if (stderr != b'') and ('lock on data' in stderr.decode('utf-8')):
             await self.kill_daemon_async()
@@ -200,7 +296,7 @@ class RpcClient:
         return True
 
     async def stop_daemon_async(self):
-        stdout, stderr = await exec_subprocess(f"{self._binary[:-1]}-cli {self._confp} stop")
+        stdout, stderr = await exec_subprocess(f"{self._binary[:-1]}-cli", *self._confp, 'stop')
         if stderr != b'':
             emsg = "Couldn't stop coin daemon!"
             if self._bot:
@@ -211,8 +307,16 @@ class RpcClient:
         log.info('Stopped Wallet daemon.')
 
     async def kill_daemon_async(self):
-        stdout, stderr = await exec_subprocess(f'killall {self._binary}')
-        if stderr != b'':
+        if self._data_dir is None:
+            # The data dir, and with it the pid file, is only known after start_daemon_async
+            raise NotStoppableError("Couldn't stop coin daemon, it was never started by this client!")
+
+        # The daemon forks away from the process we started, so signal the pid it wrote
+        pid_file = f'{self._data_dir}/{os.path.basename(self._binary)}.pid'
+        try:
+            with open(pid_file, 'rb') as fp:
+                os.kill(int(fp.read()), signal.SIGTERM)
+        except (OSError, ValueError):
             log.error("Couldn't stop coin daemon!")
             if self._bot:
                 self._bot.reload_extension(f'cogs.wallet')
@@ -221,131 +325,138 @@ class RpcClient:
         log.info('Killed Wallet daemon.')
 
     def stop_daemon(self):
-        run([f"{self._binary[:-1]}-cli", f"{self._confp}", "stop"])
+        run([f"{self._binary[:-1]}-cli", *self._confp, "stop"])
 
     async def rpc_call(self, *args, **kwargs):
         try:
-            return await self.rpc.acall(*args, **kwargs)
+            return await self._next_rpc().acall(*args, **kwargs)
         except RPCError as e:
             error_handler(e)
 
-    async def connect_daemon(self, rpc_user=None, rpc_password=None):
+    async def connect_daemon(self, rpc_user=None, rpc_password=None, pool_size: Optional[int] = None):
         if rpc_user is not None:
             self._confl.append(rpc_user)
         if rpc_password is not None:
             self._confl.append(rpc_password)
-        self.http = ClientSession()
+        if self.http is None or self.http.closed:
+            auth = BasicAuth(*self._confl[2:4]) if len(self._confl) >= 4 else None
+            connector = TCPConnector(limit=100, limit_per_host=64, keepalive_timeout=75,
+                                     enable_cleanup_closed=True, ttl_dns_cache=60 * 60)
+            self.http = ClientHttpSession(auth=auth, connector=connector)
         print(*self._confl)
-        self.rpc = BitcoinRPC(*self._confl)
-
-    async def stop(self):
-        return await self.rpc_call('stop', [])
-
-    async def move(self, from_account: str, to_account: str, amount: Union[str, int]) -> bool:
-        return await self.rpc_call('move', [from_account, to_account, amount])
-
-    async def get_info(self) -> dict:
-        return await self.rpc_call('-getinfo', [])
-
-    async def get_network_info(self) -> dict:
-        return await self.rpc_call('getnetworkinfo', [])
-
-    async def get_difficulty(self) -> float:
-        return await self.rpc_call('getdifficulty', [])
-
-    async def get_net_totals(self) -> dict:
-        return await self.rpc_call('getnettotals', [])
-
-    async def get_connection_count(self) -> int:
-        return await self.rpc_call('getconnectioncount', [])
-
-    async def get_network_hash_ps(self) -> int:
-        return await self.rpc_call('getnetworkhashps', [])
-
-    async def get_mining_info(self) -> int:
-        return await self.rpc_call('getmininginfo', [])
-
-    async def get_peer_info(self) -> dict:
-        return await self.rpc_call('getpeerinfo', [])
-
-    async def get_chain_tips(self) -> dict:
-        return await self.rpc_call('getchaintips', [])
-
-    async def get_chain_tx_stats(self) -> dict:
-        return await self.rpc_call('getchaintxstats', [])
+        # One connection per daemon rpc thread, used round-robin so concurrent
+        # calls are not serialized behind a single connection.
+        self._rpc_pool = [BitcoinRPC(*self._confl) for _ in range(pool_size or self._rpc_threads)]
+        self._next_rpc = cycle(self._rpc_pool).__next__
+        self.rpc = self._rpc_pool[0]
+
+    async def batch_call(self, *calls: Tuple[str, list]) -> list:
+        """Sends all ``(method, params)`` calls in a single JSON-RPC batch request.
+
+        Results are returned in the same order as ``calls``.
+        """
+        if not calls:
+            return []
+
+        payload = orjson.dumps([{'jsonrpc': '2.0', 'id': i, 'method': m, 'params': p}
+                                for i, (m, p) in enumerate(calls)])
+        async with self.http.post(self._rpc_url, data=payload, headers=_JSON_HEADERS) as resp:
+            resp_data = orjson.loads(await resp.read())
+
+        results = []
+        for r in sorted(resp_data, key=itemgetter('id')):
+            error = r.get('error')
+            if error:
+                raise rpc_error_lookup_table.get(error['code'], RPCException)(error['message'])
+            results.append(r['result'])
+        return results
+
+    def pipeline(self) -> RpcPipeline:
+        return RpcPipeline(self)
 
     async def validate_address(self, address: Union[str, Address]) -> bool:
-        resp = await self.rpc_call('validateaddress', [address])
-        return resp.get('isvalid', False)
-
-    async def get_wallet_info(self) -> dict:
-        return await self.rpc_call('getwalletinfo', [])
-
-    async def get_blockchain_info(self) -> dict:
-        return await self.rpc_call('getblockchaininfo', [])
+        address = str(address)
+        try:
+            return self._address_cache[address]
+        except KeyError:
+            pass
 
-    async def get_new_address(self, account_name: str) -> str:
-        return await self.rpc_call('getnewaddress', [account_name])
+        resp = await self.rpc_call('validateaddress', [address])
+        valid = self._address_cache[address] = resp.get('isvalid', False)
+        return valid
 
     async def get_account(self, address: str) -> str:
-        return await self.rpc_call('getaccount', [address])
-
-    async def get_account_address(self, account_name: str) -> str:
-        return await self.rpc_call('getaccountaddress', [account_name])
+        try:
+            return self._account_cache[address]
+        except KeyError:
+            pass
 
-    async def get_addresses_by_account(self, account_name: str) -> list:
-        return await self.rpc_call('getaddressesbyaccount', [account_name])
+        account = self._account_cache[address] = await self.rpc_call('getaccount', [address])
+        return account
 
     async def get_balance(self, account_name: Optional[str] = None) -> float:
         return await self.rpc_call('getbalance', [account_name] if account_name else [])
 
-    async def get_block_count(self) -> int:
-        return await self.rpc_call('getblockcount', [])
-
-    async def get_transaction(self, tx_id: str) -> dict:
-        return await self.rpc_call('gettransaction', [tx_id])
-
-    async def send_from(self, from_account: str, to_address: str, amount: Union[float, int]) -> str:
-        return await self.rpc_call('sendfrom', [from_account, to_address, amount])
-
     async def send_many(self, from_account: str, addresses: list, amount: Union[float, int]) -> list:
         tx_amount = {addr: amount for addr in addresses}
         return await self.rpc_call('sendmany', [from_account, tx_amount])
 
-    async def send_to_address(self, to_address: str, amount: Union[float, int]) -> list:
-        return await self.rpc_call('sendtoaddress', [to_address, amount])
-
     async def get_block(self, hash_or_height: str) -> dict:
-        return await self.rpc_call('getblock', [hash_or_height])
+        try:
+            return self._block_cache[hash_or_height]
+        except KeyError:
+            pass
+
+        block = await self.rpc_call('getblock', [hash_or_height])
+        if block and block.get('confirmations', 0) > BLOCK_CACHE_MIN_CONFIRMATIONS:
+            self._block_cache[hash_or_height] = block
+        return block
 
     async def get_block_hash(self, height: int) -> str:
+        # Not cached, a reorg can change the hash at any recent height
         return await self.rpc_call('getblockhash', [height])
 
-    async def list_accounts(self) -> dict:
-        return await self.rpc_call('listaccounts', [])
+    async def get_blocks(self, heights: Iterable[int]) -> List[dict]:
+        heights = list(heights)
+        hashes = await self.batch_call(*(('getblockhash', [h]) for h in heights))
+        return await self.batch_call(*(('getblock', [h]) for h in hashes))
 
     async def list_transactions(self, account_name: str = None) -> List[dict]:
         params = [] if not account_name else [account_name]
         return await self.rpc_call('listtransactions', params)
 
-    async def list_received_by_address(self) -> List[dict]:
-        return await self.rpc_call('listreceivedbyaddress', [])
-
     # Decorator for extended wallet functions
 
     async def list_received_by_address_only(self, address: str) -> List[dict]:
+        if await self._has_address_filter():
+            return await self.rpc_call('listreceivedbyaddress', [1, False, False, address])
         return [a for a in await self.list_received_by_address() if a['address'] == address]
 
+    async def _has_address_filter(self) -> bool:
+        """Whether ``listreceivedbyaddress`` accepts an address filter on this node."""
+        if self._address_filter is None:
+            info = await self.get_network_info()
+            self._address_filter = info.get('version', 0) >= ADDRESS_FILTER_MIN_VERSION
+        return self._address_filter
+
     async def address_was_used(self, addr: str) -> bool:
+        # Filtered by address, so there is at most one entry
+        resp = await self.list_received_by_address_only(addr)
+        return bool(resp) and resp[0].get('amount', 0) > 0
 
-        def same_address(ad):
-            return (ad['address'] == addr) and (ad['amount'] > 0)
 
-        resp = await self.list_received_by_address_only(addr)
-        for addr_dict in resp:
-            same = same_address(addr_dict)
-            if same: return True
-        return False
+def _rpc_command(name: str, method: str):
+    def command(self, *args):
+        return self.rpc_call(method, list(args))
+
+    command.__name__ = name
+    command.__qualname__ = f'RpcClient.{name}'
+    command.__doc__ = f'Calls the ``{method}`` rpc command.'
+    return command
+
+
+for _name, _method in __passthrough_commands__.items():
+    setattr(RpcClient, _name, _rpc_command(_name, _method))
 
 
 class BinaryClient:
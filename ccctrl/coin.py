@@ -1,4 +1,4 @@
-from asyncio import get_event_loop
+from asyncio import get_running_loop
 
 from .client import RpcClient
 from .daemon import WalletDaemon
@@ -25,7 +25,7 @@ class CoinController:
         self._rpc_password = rpc_password
         self._daemon_ctrl = daemon_ctrl
         self._params = None
-        self.loop = loop or get_event_loop()
+        self.loop = loop or get_running_loop()
 
         self._ext_init()
 
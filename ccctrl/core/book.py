@@ -0,0 +1,126 @@
+from typing import Optional, Sequence
+
+import numpy as np
+
+from numpy import (
+    ndarray,
+)
+
+
+DEFAULT_DEPTH = 1000
+
+
+class _BookSide:
+    """One side of an order book as parallel price and size arrays, sorted by price."""
+
+    __slots__ = ('px', 'sz', 'n', 'depth', 'descending')
+
+    def __init__(self, depth: int, descending: bool):
+        self.px: ndarray = np.empty(depth, dtype=np.float64)
+        self.sz: ndarray = np.empty(depth, dtype=np.float64)
+        self.n: int = 0
+        self.depth: int = depth
+        self.descending: bool = descending
+
+    def __len__(self):
+        return self.n
+
+    def update(self, levels: Sequence[Sequence[str]]) -> None:
+        """Applies ``[price, size]`` levels, a size of zero removes the level."""
+        if not levels:
+            return
+        upd = np.asarray(levels, dtype=np.float64).reshape(-1, 2)
+        n = self.n
+        # Existing levels first, so an update to the same price wins when deduplicated
+        px = np.concatenate((self.px[:n], upd[:, 0]))[::-1]
+        sz = np.concatenate((self.sz[:n], upd[:, 1]))[::-1]
+        px, idx = np.unique(px, return_index=True)
+        sz = sz[idx]
+        live = sz > 0
+        px, sz = px[live], sz[live]
+        if self.descending:
+            px, sz = px[::-1], sz[::-1]
+        n = min(px.shape[0], self.depth)
+        self.px[:n] = px[:n]
+        self.sz[:n] = sz[:n]
+        self.n = n
+
+    @property
+    def prices(self) -> ndarray:
+        return self.px[:self.n]
+
+    @property
+    def sizes(self) -> ndarray:
+        return self.sz[:self.n]
+
+    @property
+    def best(self) -> Optional[float]:
+        return float(self.px[0]) if self.n else None
+
+    def vwap(self) -> Optional[float]:
+        if not self.n:
+            return None
+        return float(np.average(self.prices, weights=self.sizes))
+
+
+class OrderBookTable:
+    """Structure of arrays order book, bids are kept best (highest) first,
+    asks best (lowest) first, both capped at ``depth`` levels.
+    """
+
+    __slots__ = ('bids', 'asks', 'ts')
+
+    def __init__(self, depth: int = DEFAULT_DEPTH):
+        self.bids: _BookSide = _BookSide(depth, descending=True)
+        self.asks: _BookSide = _BookSide(depth, descending=False)
+        self.ts: int = 0
+
+    def update(self, bids: Sequence[Sequence[str]], asks: Sequence[Sequence[str]], ts: int) -> None:
+        self.bids.update(bids)
+        self.asks.update(asks)
+        self.ts = ts
+
+    @property
+    def mid_price(self) -> Optional[float]:
+        if not (self.bids.n and self.asks.n):
+            return None
+        return float(self.bids.px[0] + self.asks.px[0]) / 2
+
+    @property
+    def spread(self) -> Optional[float]:
+        if not (self.bids.n and self.asks.n):
+            return None
+        return float(self.asks.px[0] - self.bids.px[0])
+
+
+class TradeTable:
+    """Ring buffer of the last ``size`` trades as parallel price, quantity and timestamp arrays."""
+
+    __slots__ = ('px', 'sz', 'ts', '_pos', '_full')
+
+    def __init__(self, size: int = DEFAULT_DEPTH):
+        self.px: ndarray = np.empty(size, dtype=np.float64)
+        self.sz: ndarray = np.empty(size, dtype=np.float64)
+        self.ts: ndarray = np.empty(size, dtype=np.int64)
+        self._pos: int = 0
+        self._full: bool = False
+
+    def __len__(self):
+        return self.px.shape[0] if self._full else self._pos
+
+    def append(self, price: float, quantity: float, ts: int) -> None:
+        pos = self._pos
+        self.px[pos] = price
+        self.sz[pos] = quantity
+        self.ts[pos] = ts
+        pos += 1
+        if pos == self.px.shape[0]:
+            pos = 0
+            self._full = True
+        self._pos = pos
+
+    def vwap(self) -> Optional[float]:
+        n = len(self)
+        if not n:
+            return None
+        return float(np.average(self.px[:n], weights=self.sz[:n]))
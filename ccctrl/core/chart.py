@@ -1,14 +1,14 @@
 import datetime
-from dataclassy import dataclass
+from typing import NamedTuple
+
+import numpy as np
 
 from numpy import (
     ndarray,
 )
 
 
-
-@dataclass(slots=True, frozen=True, repr=True, eq=True)
-class Candle:
+class Candle(NamedTuple):
     o: float
     h: float
     l: float
@@ -17,17 +17,53 @@ class Candle:
     t: datetime.datetime
 
 
-@dataclass(slots=True)
 class OhlcvTable:
+    """Column oriented OHLCV storage.
+
+    Prices and volume live in one contiguous ``float32`` buffer of shape ``(n, 5)``,
+    the columns are exposed as zero-copy views.
+    """
+
+    __slots__ = ('_ohlcv', 't')
+
+    def __init__(self, n: int = 0):
+        self._ohlcv: ndarray = np.empty((n, 5), dtype=np.float32, order='F')
+        self.t: ndarray = np.empty(n, dtype='datetime64[s]')
+
+    def __len__(self):
+        return self.t.shape[0]
+
+    @property
+    def o(self) -> ndarray:
+        return self._ohlcv[:, 0]
+
+    @property
+    def h(self) -> ndarray:
+        return self._ohlcv[:, 1]
+
+    @property
+    def l(self) -> ndarray:
+        return self._ohlcv[:, 2]
+
+    @property
+    def c(self) -> ndarray:
+        return self._ohlcv[:, 3]
 
-    __slots__ = ('o', 'h', 'l', 'c', 'v', 't')
+    @property
+    def v(self) -> ndarray:
+        return self._ohlcv[:, 4]
 
-    def __init__(self, **kwargs):
-        self.o: ndarray = kwargs.get('o')
-        self.h: ndarray = kwargs.get('h')
-        self.l: ndarray = kwargs.get('l')
-        self.c: ndarray = kwargs.get('c')
-        self.v: ndarray = kwargs.get('v')
-        self.t: ndarray = kwargs.get('t')
+    def candle(self, i: int) -> Candle:
+        o, h, l, c, v = self._ohlcv[i].tolist()
+        return Candle(o, h, l, c, v, self.t[i].item())
 
-    async def from_table(self, table):
+    @classmethod
+    def from_table(cls, table) -> "OhlcvTable":
+        """Builds a table from rows of ``[timestamp, open, high, low, close, volume]``
+        with the timestamp in milliseconds, as returned by exchange kline endpoints.
+        """
+        rows = np.asarray(table, dtype=np.float64).reshape(-1, 6)
+        ohlcv = cls(rows.shape[0])
+        ohlcv._ohlcv[:] = rows[:, 1:6]
+        ohlcv.t[:] = rows[:, 0].astype(np.int64).astype('datetime64[ms]')
+        return ohlcv
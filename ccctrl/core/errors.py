@@ -19,6 +19,8 @@ CCCException
 """
 
 
+from types import MappingProxyType
+
 from aiohttp import ClientResponse
 
 
@@ -89,7 +91,7 @@ class HTTPException(CCCException):
             errors = message.get('errors')
             if errors:
                 errors = flatten_error_dict(errors)
-                helpful = '\n'.join(f'In %s: %s' % t for t in errors.items())
+                helpful = '\n'.join(['In %s: %s' % t for t in errors.items()])
                 self.text = base + '\n' + helpful
             else:
                 self.text = base
@@ -275,4 +277,12 @@ __exceptions__ = (
 
 __all_exceptions__ = __exceptions__ + __rpc_errors__
 
-rpc_error_lookup_table = {e.code: e for e in __rpc_errors__}
+rpc_error_lookup_table = MappingProxyType({e.code: e for e in __rpc_errors__})
+
+_lookup_rpc_error = rpc_error_lookup_table.get
+
+
+def error_handler(e):
+    """Re-raises an rpc library error as the matching :exc:`RPCException` subclass."""
+    raise (_lookup_rpc_error(e.code) or RPCException)(e.args[0] if e.args else '') from e
+
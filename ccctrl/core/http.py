@@ -1,8 +1,8 @@
 import asyncio
-import json
 from types import TracebackType
 from logging import getLogger
 
+import orjson
 from aiohttp import (
     BaseConnector,
     TCPConnector,
@@ -27,22 +27,35 @@ from aiohttp import (
     ClientSession,
     BasicAuth,
 )
+from multidict import CIMultiDict, CIMultiDictProxy
 
 from core.utils import ccctrl_user_agent
 
 log = getLogger(__name__)
 
+_DEFAULT_HEADERS = CIMultiDictProxy(CIMultiDict({
+    'content-type': 'application/json',
+    'User-Agent': ccctrl_user_agent,
+}))
+
+_WS_HEADERS = CIMultiDictProxy(CIMultiDict({
+    'User-Agent': ccctrl_user_agent,
+}))
+
+
+def _json_dumps(obj: Any) -> str:
+    # aiohttp expects a str from json_serialize. Request payloads only
+    # contain JSON native types, so orjson never needs a default hook.
+    return orjson.dumps(obj).decode('utf-8')
+
 
 async def json_or_text(response):
-    text = await response.text(encoding='utf-8')
-    try:
-        if response.headers['content-type'] == 'application/json':
-            return json.loads(text)
-    except KeyError:
-        # Thanks Cloudflare
-        pass
+    raw = await response.read()
+    # Thanks Cloudflare, content-type might be missing
+    if 'application/json' in response.headers.get('content-type', ''):
+        return orjson.loads(raw)
 
-    return text
+    return raw.decode('utf-8', 'replace')
 
 
 class HttpClient:
@@ -72,9 +85,7 @@ class HttpClient:
             password=proxy_pass,
             encoding='utf-8') if (proxy_user and proxy_pass) else None
 
-        self.headers: dict = {
-            'content-type': 'application/json',
-        }
+        self.headers: CIMultiDict = _DEFAULT_HEADERS.copy()
         self.headers.update(kwargs.get('headers', {}))
 
         max_conns: int = 100 if isinstance(self, HttpClient) else kwargs.get('max_connections', 30)
@@ -84,11 +95,18 @@ class HttpClient:
         self._connector: BaseConnector = TCPConnector(
             loop=self.loop,
             limit=max_conns,
+            limit_per_host=kwargs.get('max_connections_per_host', 64),
+            keepalive_timeout=75,
+            enable_cleanup_closed=True,
+            force_close=False,
+            use_dns_cache=True,
             ttl_dns_cache=60 * 60
         )
 
         self._repeats_on_error: int = 5
 
+        self.verbose: bool = kwargs.get('verbose', False)
+
         self.session: Optional[ClientSession] = None
 
         self._unlocked = asyncio.Event()
@@ -106,7 +124,8 @@ class HttpClient:
             auth=self.auth,
             headers=self.headers,
             connector=self._connector,
-            response_class=self._resp_cls
+            response_class=self._resp_cls,
+            json_serialize=_json_dumps,
         )
 
     async def request(
@@ -121,45 +140,63 @@ class HttpClient:
         if not method:
             method = 'GET'
 
+        if data is not None:
+            kwargs['data'] = data if isinstance(data, (bytes, str)) else orjson.dumps(data)
+
+        # global -> local
+        session_request = self.session.request
+        unlocked = self._unlocked
+        sleep = asyncio.sleep
+
         for tries in range(self._repeats_on_error):
+            if not unlocked.is_set():
+                # Another request is sleeping off a global rate limit
+                await unlocked.wait()
+
             try:
-                async with self.session.request(method, url, **kwargs) as resp:
+                async with session_request(method, url, **kwargs) as resp:
+                    status = resp.status
 
-                    log.info(f'{method} {url} with {data} has returned {resp.status}')
+                    log.info('%s %s with %s has returned %s', method, url, data, status)
 
                     resp_data = await json_or_text(resp)
 
-                    if 300 > resp.status >= 200:
-                        log.debug(f'{method} {url} has received {resp_data}')
+                    if 300 > status >= 200:
+                        log.debug('%s %s has received %s', method, url, resp_data)
                         return resp, resp_data
 
-                    if resp.status == 429:
+                    if status == 429:
                         # Checks for rate limits
                         if not resp.headers.get('Via'):
                             raise HTTPException(resp, resp_data)
 
                         retry_after = resp_data['retry_after'] / 1000.0
-                        log.warning(f'We are being rate limited. Retrying in {retry_after:.2f} seconds.')
+                        log.warning('We are being rate limited. Retrying in %.2f seconds.', retry_after)
 
                         is_global = resp_data.get('global', False)
                         if is_global:
-                            log.warning(f'Global rate limit has been hit. Retrying in {retry_after:.2f} seconds.')
-                            self._unlocked.clear()
-
-                        await asyncio.sleep(retry_after)
+                            # Only the first request to hit the global limit sleeps,
+                            # the others wait for it at the top of the loop.
+                            if unlocked.is_set():
+                                log.warning('Global rate limit has been hit. Retrying in %.2f seconds.', retry_after)
+                                unlocked.clear()
+                                try:
+                                    await sleep(retry_after)
+                                finally:
+                                    unlocked.set()
+                                log.debug('Global rate limit is now over.')
+                            continue
+
+                        await sleep(retry_after)
                         log.info('Done sleeping for the rate limit. Retrying...')
-
-                        if is_global:
-                            self._unlocked.set()
-                            log.debug('Global rate limit is now over.')
                         continue
 
-                    if resp.status in {500, 502}:
-                        await asyncio.sleep(1 + tries * 2)
+                    if status in {500, 502}:
+                        await sleep(1 + tries * 2)
                         continue
-                    if resp.status == 403:
+                    if status == 403:
                         raise Forbidden(resp, resp_data)
-                    elif resp.status == 404:
+                    elif status == 404:
                         raise NotFound(resp, resp_data)
                     else:
                         raise HTTPException(resp, resp_data)
@@ -192,16 +229,14 @@ class HttpClient:
         await self.session.close()
 
     async def ws_connect(self, url, *, compress=0):
-        kwargs = {
-            'proxy': self.proxy,
-            'timeout': 30.0,
-            'autoclose': False,
-            'headers': {
-                'User-Agent': ccctrl_user_agent
-            },
-            'compress': compress
-        }
         if self.session is None:
-            await self.create_session()
-
-        return await self.session.ws_connect(url, **kwargs)
+            self.session = await self.create_session()
+
+        return await self.session.ws_connect(
+            url,
+            proxy=self.proxy,
+            timeout=30.0,
+            autoclose=False,
+            headers=_WS_HEADERS,
+            compress=compress,
+        )
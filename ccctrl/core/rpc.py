@@ -1,13 +1,23 @@
+from asyncio import Semaphore, TimeoutError, gather, sleep
 from logging import getLogger
 from itertools import count
+from random import uniform
+from time import monotonic
 
+from aiohttp import ClientConnectorError, ServerDisconnectedError
 from yarl import URL
 import orjson
+import msgspec
 
 from typing import (
     Optional,
-    Literal,
+    Awaitable,
+    Callable,
+    Iterable,
+    NoReturn,
     Union,
+    Tuple,
+    Dict,
     List,
     Any,
 )
@@ -15,7 +25,6 @@ from typing import (
 from core.http import HttpClient
 from core.types import (
     WalletResponseType,
-    ChainTipsDetail,
     ConnectionCount,
     ValidateAddress,
     BestBlockHash,
@@ -28,6 +37,8 @@ from core.types import (
     MiningInfo,
     BlockHash,
     ChainTips,
+    RpcResponse,
+    RpcError,
     NodeInfo,
     Block,
 )
@@ -35,12 +46,64 @@ from core.types import (
 
 from core.errors import (
     rpc_error_lookup_table,
+    RPCException,
+    Forbidden,
 )
+from core.utils import LRUCache
 
 log = getLogger(__name__)
 
 
 _req_id = count(1)
+_next_id = _req_id.__next__
+
+_JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# Blocks and headers are looked up by hash, so their content never changes
+BLOCK_CACHE_SIZE = 4096
+
+# bestblockhash and blockcount change at most once per block
+TIP_CACHE_TTL = 0.25
+
+# Requests gather_rpcs keeps in flight, stays below the node's default rpcthreads
+GATHER_LIMIT = 16
+
+# Delay before the n-th retry is min(RETRY_BASE_DELAY * 2 ** n, RETRY_MAX_DELAY) plus jitter
+RETRY_BASE_DELAY = 0.05
+RETRY_MAX_DELAY = 1.0
+
+# Constant head of the JSON-RPC envelope, keyed by method name
+_envelope_prefix: Dict[str, bytes] = {}
+
+
+def _prefix(method: str) -> bytes:
+    try:
+        return _envelope_prefix[method]
+    except KeyError:
+        prefix = _envelope_prefix[method] = b'{"jsonrpc":"2.0","method":' + orjson.dumps(method) + b',"id":'
+        return prefix
+
+
+def _envelope(method: str, params: List[Any], req_id: int) -> bytes:
+    return b'%s%d,"params":%s}' % (_prefix(method), req_id, orjson.dumps(params))
+
+
+# One decoder per response type, building them is far more expensive than decoding
+_decoders: Dict[Any, msgspec.json.Decoder] = {}
+
+
+def _decoder(response_type: Any) -> msgspec.json.Decoder:
+    try:
+        return _decoders[response_type]
+    except KeyError:
+        dec = _decoders[response_type] = msgspec.json.Decoder(response_type)
+        return dec
+
+
+def _raise_rpc(error: RpcError) -> NoReturn:
+    # Kept out of request() so the success path stays short
+    raise rpc_error_lookup_table.get(error.code, RPCException)(error.message)
+
 
 rpc_methods = {
     'help': str,
@@ -52,6 +115,31 @@ class RPCClient(HttpClient):
     def __init__(self, host: str, port: int, **kwargs: Any):
         super().__init__(**kwargs)
         self.url: URL = URL(f"http://{host}:{port}")
+        self._block_cache: LRUCache = LRUCache(BLOCK_CACHE_SIZE)
+        self._header_cache: LRUCache = LRUCache(BLOCK_CACHE_SIZE)
+        self._tip_cache: Dict[str, Tuple[float, Any]] = {}
+
+    def invalidate_tip_cache(self) -> None:
+        """Drops the cached best block hash and block count, e.g. on a block notification."""
+        self._tip_cache.clear()
+
+    async def _tip_request(self, method: str) -> Any:
+        now = monotonic()
+        try:
+            expires, value = self._tip_cache[method]
+        except KeyError:
+            pass
+        else:
+            if now < expires:
+                return value
+
+        value = await self.request(method=method)
+        self._tip_cache[method] = (now + TIP_CACHE_TTL, value)
+        return value
+
+    def _post_json(self, json_data: bytes):
+        """Returns the request context manager for posting an already serialized body."""
+        return self.session.post(self.url, data=json_data, headers=_JSON_HEADERS, proxy=self.proxy)
 
     async def request(
         self,
@@ -59,138 +147,212 @@ class RPCClient(HttpClient):
         params: List[Optional[Union[str, int, List[str]]]] = None,
         json_data: Any = None,
         repeats: int = 5,
+        response_type: Any = None,
         **kwargs: Any,
     ) -> WalletResponseType:
+        """Sends a single JSON-RPC call and returns its ``result``.
 
-        if params is None:
-            params = []
-
-        json_data = orjson.dumps({
-            'method': method,
-            'params': params,
-            'id': next(_req_id),
-            'jsonrpc': "2.0",
-        })
+        With a ``response_type`` the result is decoded and validated straight
+        into that type, otherwise into plain Python objects.
+        """
+        decode = _decoder(RpcResponse[Any if response_type is None else response_type]).decode
+        return await self._send(_envelope(method, params if params is not None else [], _next_id()), decode, method, repeats)
 
+    async def _post(self, json_data: bytes, decode: Callable[[bytes], Any], method: str, repeats: int = 5) -> Any:
+        """Posts a serialized body, retrying connection failures, and returns the decoded reply."""
         for tries in range(repeats):
             try:
-                async with self.session.request(url=self.url, method='POST', proxy=self.proxy, data=json_data) as resp:
-
-                    resp_data: dict = await resp.json()
-                    error: Optional[dict] = resp_data.get('error', None)
-
-                    if not error and not self.verbose:
-                        return resp_data['result']
-
-                    errcode, errmsg = error['code'], error['message']
-
-                    raise rpc_error_lookup_table[errcode](f'{errmsg}')
-
-            except OSError as e:
-                if tries < 4 and e.errno in (54, 10054):
-                    continue
-                raise
-
-    # == GENERAL ==
-
-    async def help(self) -> str:
-        return await self.request('help')
-
-    async def stop(self) -> None:
-        return await self.request('stop')
-
-    async def uptime(self):
-        return await self.request('uptime')
+                async with self._post_json(json_data) as resp:
+                    if resp.status in (401, 403):
+                        # Wrong rpcuser/rpcpassword or rpcallowip, the body is empty
+                        raise Forbidden(resp, 'RPC authentication rejected')
+                    return decode(await resp.read())
+
+            except (ClientConnectorError, ServerDisconnectedError, TimeoutError):
+                if tries == repeats - 1:
+                    raise
+                log.debug('RPC %s failed on attempt %d, retrying.', method, tries + 1)
+                await sleep(min(RETRY_BASE_DELAY * 2 ** tries, RETRY_MAX_DELAY) + uniform(0, RETRY_BASE_DELAY))
+
+    async def _send(self, json_data: bytes, decode: Callable[[bytes], RpcResponse], method: str, repeats: int = 5):
+        """Posts a serialized call and returns the decoded ``result``."""
+        envelope = await self._post(json_data, decode, method, repeats)
+        if envelope.error is None:
+            return envelope.result
+        _raise_rpc(envelope.error)
+
+    async def batch_request(
+        self,
+        calls: List[Tuple[str, List[Any]]],
+        batch_size: int = 100,
+        response_type: Any = None,
+        repeats: int = 5,
+    ) -> List[Any]:
+        """Sends ``(method, params)`` calls as JSON-RPC batches and returns
+        the results in the order of ``calls``.
+
+        The calls are split into batches of at most ``batch_size`` requests,
+        as some nodes and providers cap the size of a batch. With a
+        ``response_type`` every result is decoded into that type.
+        """
+        envelope = RpcResponse[Any if response_type is None else response_type]
+        # A batch the node can't process at all is answered with one error object, not a list
+        decode = _decoder(Union[List[envelope], envelope]).decode
+        # Ids are the positions in ``calls``, so a reply is stored without an id lookup
+        results = [None] * len(calls)
+        for start in range(0, len(calls), batch_size):
+            chunk = calls[start:start + batch_size]
+            json_data = b'[%s]' % b','.join([
+                _envelope(method, params, req_id) for req_id, (method, params) in enumerate(chunk, start)
+            ])
+
+            resp_data = await self._post(json_data, decode, 'batch', repeats)
+            if not isinstance(resp_data, list):
+                _raise_rpc(resp_data.error or RpcError(code=-32603, message='Batch answered without a result list'))
+
+            if len(resp_data) != len(chunk):
+                _raise_rpc(RpcError(code=-32603, message=f'Batch of {len(chunk)} calls answered with {len(resp_data)} replies'))
+
+            # With as many replies as calls, every id must show up exactly once
+            seen = set()
+            for item in resp_data:
+                if item.error is not None:
+                    _raise_rpc(item.error)
+                req_id = item.id
+                if not isinstance(req_id, int) or not start <= req_id < start + len(chunk):
+                    _raise_rpc(RpcError(code=-32603, message=f'Batch reply with unknown id {req_id!r}'))
+                if req_id in seen:
+                    _raise_rpc(RpcError(code=-32603, message=f'Batch reply with duplicate id {req_id}'))
+                seen.add(req_id)
+                results[req_id] = item.result
+
+        return results
+
+    async def gather_rpcs(self, coros: Iterable[Awaitable[Any]], limit: int = GATHER_LIMIT) -> List[Any]:
+        """Runs independent requests concurrently over the shared session and
+        returns their results in order, with at most ``limit`` in flight.
+        """
+        sem = Semaphore(limit)
+
+        async def run(coro):
+            async with sem:
+                return await coro
+
+        return await gather(*[run(c) for c in coros])
 
     # == Blockchain ==
 
     async def get_best_blockhash(self) -> BestBlockHash:
-        return BestBlockHash(value=await self.request(method='getbestblockhash'))
+        return BestBlockHash(await self._tip_request('getbestblockhash'))
 
     async def get_block(self, blockhash: str, verbose: bool = False) -> Block:
-        return Block(**await self.request(method='getblock', params=[blockhash, 2 if verbose else 1]))
-
-    async def get_blockchain_info(self):
-        return await self.request(method='getblockchaininfo')
+        """Cached by hash, ``confirmations`` and ``nextblockhash`` are as of the first fetch."""
+        key = (blockhash, verbose)
+        try:
+            return self._block_cache[key]
+        except KeyError:
+            block = await self.request(method='getblock', params=[blockhash, 2 if verbose else 1], response_type=Block)
+            self._block_cache[key] = block
+            return block
+
+    async def get_blocks(self, blockhashes: Iterable[str], verbose: bool = False) -> List[Block]:
+        verbosity = 2 if verbose else 1
+        return await self.batch_request([('getblock', [h, verbosity]) for h in blockhashes], response_type=Block)
 
     async def get_block_count(self) -> BlockCount:
-        return BlockCount(value=await self.request(method='getblockcount'))
-
-    async def get_block_hash(self, height: int) -> BlockHash:
-        return BlockHash(value=await self.request(method='getblockhash', params=[height]))
+        return BlockCount(await self._tip_request('getblockcount'))
 
     async def get_block_header(self, blockhash: str) -> BlockHeader:
-        return BlockHeader(**await self.request(method='getblockheader', params=[blockhash]))
-
-    async def get_chaintips(self) -> ChainTips:
-        resp = await self.request(method='getchaintips')
-        return [ChainTipsDetail(**c) for c in resp]
-
-    async def get_chain_tx_stats(self, nblocks: int = None, blockhash: str = None) -> ChainTxStats:
-        return ChainTxStats(**await self.request(method='getchaintxstats', params=[nblocks, blockhash]))
-
-    async def get_difficulty(self) -> Difficulty:
-        return Difficulty(value=await self.request(method='getdifficulty'))
-
-    async def get_mempool_ancestors(self, txid: str, verbose: bool = True):
-        return await self.request(method='getmempoolancestors', params=[txid, verbose])
-
-    async def get_mempool_descendants(self, txid: str, verbose: bool = True):
-        return await self.request(method='getmempooldescendants', params=[txid, verbose])
-
-    async def get_mempool_entry(self, txid: str):
-        return await self.request(method='getmempoolentry', params=[txid])
-
-    async def get_mempool_info(self) -> MempoolInfo:
-        return MempoolInfo(**await self.request(method='getmempoolinfo'))
+        """Cached by hash, ``confirmations`` and ``nextblockhash`` are as of the first fetch."""
+        try:
+            return self._header_cache[blockhash]
+        except KeyError:
+            header = await self.request(method='getblockheader', params=[blockhash], response_type=BlockHeader)
+            self._header_cache[blockhash] = header
+            return header
 
-    async def get_raw_mempool(self):
-        return await self.request(method='getrawmempool')
+    async def get_mempool_entries(self, txids: Iterable[str]) -> List[Any]:
+        return await self.gather_rpcs(self.get_mempool_entry(txid) for txid in txids)
 
     # == Mining ==
 
-    async def get_mining_info(self) -> MiningInfo:
-        return MiningInfo(**await self.request(method='getmininginfo'))
-
     async def get_networkhash_ps(self, nblocks: int = 120, height: int = 1) -> NetworkHashps:
-        return NetworkHashps(value=await self.request(method='getrawmempool', params=[nblocks, height]))
+        return NetworkHashps(value=await self.request(method='getnetworkhashps', params=[nblocks, height]))
 
     # == Network ==
 
-    async def add_node(self, node: str, command: Literal['add', 'remove', 'onetry']) -> None:
-        return await self.request(method='addnode', params=[node, command])
-
-    async def clear_banned(self) -> None:
-        """Clear all banned IPs."""
-        return await self.request(method='clearbanned')
-
     async def get_added_nodeinfo(self, node: str) -> NodeInfo:
         """Returns information about the given added node, or all added nodes"""
         info = await self.request(method='getaddednodeinfo', params=[node])
         print(info)
 
-    async def get_connection_count(self) -> ConnectionCount:
-        return ConnectionCount(value=await self.request(method='getconnectioncount'))
-
-    async def get_net_totals(self):
-        return await self.request(method='getnettotals')
-
-    async def get_network_info(self):
-        return await self.request(method='getnetworkinfo')
-
-    async def get_peer_info(self):
-        return await self.request(method='getpeerinfo')
+    # == Wallet ==
 
-    async def list_banned(self):
-        return await self.request(method='listbanned')
+    async def validate_addresses(self, addresses: Iterable[str]) -> List[ValidateAddress]:
+        return await self.gather_rpcs(self.validate_address(a) for a in addresses)
 
-    async def ping(self) -> None:
-        """Requests that a ping be sent to all other nodes, to measure ping time.
-        Results provided in getpeerinfo, pingtime and pingwait fields are decimal seconds."""
-        return await self.request(method='ping')
 
+# Plain one-call wrappers, (name, rpc method, result type, signature, docstring).
+# A result type of None leaves the result as decoded JSON.
+_RPC_SPEC = (
+    # == General ==
+    ('help', 'help', str, '', None),
+    ('stop', 'stop', None, '', None),
+    ('uptime', 'uptime', int, '', None),
+    # == Blockchain ==
+    ('get_blockchain_info', 'getblockchaininfo', None, '', None),
+    ('get_block_hash', 'getblockhash', BlockHash, 'height', None),
+    ('get_chaintips', 'getchaintips', ChainTips, '', None),
+    ('get_chain_tx_stats', 'getchaintxstats', ChainTxStats, 'nblocks=None, blockhash=None', None),
+    ('get_difficulty', 'getdifficulty', Difficulty, '', None),
+    ('get_mempool_ancestors', 'getmempoolancestors', None, 'txid, verbose=True', None),
+    ('get_mempool_descendants', 'getmempooldescendants', None, 'txid, verbose=True', None),
+    ('get_mempool_entry', 'getmempoolentry', None, 'txid', None),
+    ('get_mempool_info', 'getmempoolinfo', MempoolInfo, '', None),
+    ('get_raw_mempool', 'getrawmempool', None, '', None),
+    # == Mining ==
+    ('get_mining_info', 'getmininginfo', MiningInfo, '', None),
+    # == Network ==
+    ('add_node', 'addnode', None, 'node, command', "``command`` is one of 'add', 'remove' or 'onetry'."),
+    ('clear_banned', 'clearbanned', None, '', 'Clear all banned IPs.'),
+    ('get_connection_count', 'getconnectioncount', ConnectionCount, '', None),
+    ('get_net_totals', 'getnettotals', None, '', None),
+    ('get_network_info', 'getnetworkinfo', None, '', None),
+    ('get_peer_info', 'getpeerinfo', None, '', None),
+    ('list_banned', 'listbanned', None, '', None),
+    ('ping', 'ping', None, '', 'Requests that a ping be sent to all other nodes, to measure ping time.\n'
+                               'Results provided in getpeerinfo, pingtime and pingwait fields are decimal seconds.'),
     # == Wallet ==
+    ('validate_address', 'validateaddress', ValidateAddress, 'address', None),
+)
 
-    async def validate_address(self, address: str) -> ValidateAddress:
-        return ValidateAddress(**await self.request(method='validateaddress', params=[address]))
-
+_RPC_TEMPLATE = """\
+async def {name}(self{signature}):
+    return await self._send(_PREFIX + b'%d,"params":%s}}' % (_next_id(), _dumps([{params}])), _DECODE, {method!r})
+"""
+
+
+def _rpc_method(name: str, method: str, response_type: Any, signature: str, doc: Optional[str]):
+    """Compiles a wrapper with its envelope prefix and decoder bound as constants,
+    so a call only formats the id and params.
+    """
+    params = ', '.join(arg.split('=')[0].strip() for arg in signature.split(',') if arg.strip())
+    namespace = {
+        '_PREFIX': _prefix(method),
+        '_DECODE': _decoder(RpcResponse[Any if response_type is None else response_type]).decode,
+        '_next_id': _next_id,
+        '_dumps': orjson.dumps,
+    }
+    src = _RPC_TEMPLATE.format(name=name, signature=f', {signature}' if signature else '', params=params, method=method)
+    exec(compile(src, f'<rpc {name}>', 'exec'), namespace)
+
+    func = namespace[name]
+    func.__qualname__ = f'RPCClient.{name}'
+    func.__module__ = __name__
+    func.__doc__ = doc or f'Calls the ``{method}`` rpc command.'
+    func.__annotations__ = {'return': response_type}
+    return func
+
+
+for _spec in _RPC_SPEC:
+    setattr(RPCClient, _spec[0], _rpc_method(*_spec))
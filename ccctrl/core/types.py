@@ -1,10 +1,12 @@
 from enum import Enum
-from dataclassy import dataclass
+import msgspec
 from typing_extensions import Literal
 from yarl import URL
 
 from typing import (
     TypeVar,
+    Generic,
+    Optional,
     Union,
     Dict,
     List,
@@ -21,8 +23,7 @@ Difficulty = float
 BlockCount = int
 
 
-@dataclass(kwargs=True, slots=True)
-class NetworkHashps:
+class NetworkHashps(msgspec.Struct, kw_only=True, gc=False):
     value: float
 
     def in_MHps(self):
@@ -32,8 +33,7 @@ class NetworkHashps:
         return self.value / 1024 / 1024
 
 
-@dataclass(kwargs=True, slots=True)
-class _RawTransaction:
+class _RawTransaction(msgspec.Struct, kw_only=True, gc=False):
     txid: str
     hash: BlockHash
     version: int
@@ -43,17 +43,16 @@ class _RawTransaction:
     vin: List[Dict[str, Any]]
     vout: List[Dict[str, Any]]
     hex: str
-    blockhash: str
-    confirmations: str
-    time: int
-    blocktime: int
+    blockhash: Optional[str] = None
+    confirmations: Optional[int] = None
+    time: Optional[int] = None
+    blocktime: Optional[int] = None
 
 
 RawTransaction = Union[str, _RawTransaction]
 
 
-@dataclass(kwargs=True, slots=True)
-class BlockHeader:
+class BlockHeader(msgspec.Struct, kw_only=True, gc=False):
     hash: BlockHash
     confirmations: int
     height: BlockCount
@@ -67,19 +66,18 @@ class BlockHeader:
     difficulty: float
     chainwork: str
     nTx: int
-    previousblockhash: str
-    nextblockhash: str
+    previousblockhash: Optional[str] = None
+    nextblockhash: Optional[str] = None
 
 
-class Block(BlockHeader):
+class Block(BlockHeader, kw_only=True, gc=False):
     strippedsize: int
     size: int
     weight: int
     tx: List[RawTransaction]
 
 
-@dataclass(kwargs=True, slots=True)
-class WalletInfo:
+class WalletInfo(msgspec.Struct, kw_only=True, gc=False):
     walletname: str
     walletversion: int
     balance: float
@@ -94,8 +92,7 @@ class WalletInfo:
     hdmasterkeyid: str
 
 
-@dataclass(kwargs=True, slots=True)
-class MempoolInfo:
+class MempoolInfo(msgspec.Struct, kw_only=True, gc=False):
 
     size: int
     bytes: int
@@ -105,8 +102,7 @@ class MempoolInfo:
     minrelaytxfee: float
 
 
-@dataclass(kwargs=True, slots=True)
-class _NetInfoNetwork:
+class _NetInfoNetwork(msgspec.Struct, kw_only=True, gc=False):
     name: str
     limited: bool
     reachable: bool
@@ -114,15 +110,13 @@ class _NetInfoNetwork:
     proxy_randomize_credentials: bool
 
 
-@dataclass(kwargs=True, slots=True)
-class _NetInfoLocalAddress:
+class _NetInfoLocalAddress(msgspec.Struct, kw_only=True, gc=False):
     address: str
     port: int
     score: float
 
 
-@dataclass(kwargs=True, slots=True)
-class NetworkInfo:
+class NetworkInfo(msgspec.Struct, kw_only=True, gc=False):
     version: int
     subversion: str
     protocolversion: str
@@ -138,14 +132,13 @@ class NetworkInfo:
     warnings: str
 
 
-@dataclass(kwargs=True, slots=True)
-class _Info:
+class _Info(msgspec.Struct, kw_only=True, gc=False):
     difficulty: float
     blocks: int
     warnings: str
 
 
-class BlockchainInfo(_Info):
+class BlockchainInfo(_Info, kw_only=True, gc=False):
     chain: Literal["main", "test", "regtest"]
     headers: int
     bestblockhash: str
@@ -166,8 +159,7 @@ class ChainTipsStatus(Enum):
     INVALID = 'invalid'
 
 
-@dataclass(kwargs=True, slots=True)
-class ChainTipsDetail:
+class ChainTipsDetail(msgspec.Struct, kw_only=True, gc=False):
     height: int
     hash: str
     branchlen: int
@@ -177,8 +169,7 @@ class ChainTipsDetail:
 ChainTips = List[ChainTipsDetail]
 
 
-@dataclass(kwargs=True, slots=True)
-class ChainTxStats:
+class ChainTxStats(msgspec.Struct, kw_only=True, gc=False):
     time: int
     txcount: int
     window_block_count: int
@@ -187,78 +178,88 @@ class ChainTxStats:
     txrate: float
 
 
-@dataclass(kwargs=True, slots=True)
-class BlockStats:
+class BlockStats(msgspec.Struct, kw_only=True, gc=False):
     """
     Returned dictionary will contain subset of the following, depending on filtering.
     """
 
-    avgfee: int
-    avgfeerate: int
-    avgtxsize: int
-    blockhash: str
-    feerate_percentiles: List[int]
-    heigth: int
-    ins: int
-    maxfee: int
-    maxfeerate: int
-    maxtxsize: int
-    medianfee: int
-    mediantime: int
-    mediantxsize: int
-    minfee: int
-    minfeerate: int
-    mintxsize: int
-    outs: int
-    subsidy: int
-    swtotal_size: int
-    swtotal_weight: int
-    swtxs: int
-    time: int
-    total_out: int
-    total_size: int
-    total_weight: int
-    totalfee: int
-    txs: int
-    utxo_increase: int
-    utxo_size_inc: int
-
-
-@dataclass(kwargs=True, slots=True)
-class MiningInfo:
+    avgfee: Optional[int] = None
+    avgfeerate: Optional[int] = None
+    avgtxsize: Optional[int] = None
+    blockhash: Optional[str] = None
+    feerate_percentiles: Optional[List[int]] = None
+    heigth: Optional[int] = None
+    ins: Optional[int] = None
+    maxfee: Optional[int] = None
+    maxfeerate: Optional[int] = None
+    maxtxsize: Optional[int] = None
+    medianfee: Optional[int] = None
+    mediantime: Optional[int] = None
+    mediantxsize: Optional[int] = None
+    minfee: Optional[int] = None
+    minfeerate: Optional[int] = None
+    mintxsize: Optional[int] = None
+    outs: Optional[int] = None
+    subsidy: Optional[int] = None
+    swtotal_size: Optional[int] = None
+    swtotal_weight: Optional[int] = None
+    swtxs: Optional[int] = None
+    time: Optional[int] = None
+    total_out: Optional[int] = None
+    total_size: Optional[int] = None
+    total_weight: Optional[int] = None
+    totalfee: Optional[int] = None
+    txs: Optional[int] = None
+    utxo_increase: Optional[int] = None
+    utxo_size_inc: Optional[int] = None
+
+
+class MiningInfo(msgspec.Struct, kw_only=True, gc=False):
     networkhashps: float
     pooledtx: int
     chain: Literal["main", "test", "regtest"]
 
 
-@dataclass(kwargs=True, slots=True)
-class NodeInfoAddress:
+class NodeInfoAddress(msgspec.Struct, kw_only=True, gc=False):
     address: str
     connected: Literal['inbound', 'outbound']
 
 
-@dataclass(kwargs=True, slots=True)
-class NodeInfo:
+class NodeInfo(msgspec.Struct, kw_only=True, gc=False):
     addednode: str
     connected: bool
     addresses: List[NodeInfoAddress]
 
 
-@dataclass(kwargs=True, slots=True)
-class ValidateAddress:
+class ValidateAddress(msgspec.Struct, kw_only=True, gc=False):
     isvalid: bool
-    address: str
-    scriptPubKey: str
-    ismine: bool
-    iswatchonly: bool
-    isscript: bool
-    iswitness: bool
-    pubkey: str
-    iscompressed: bool
-    account: str
-    timestamp: int
-    hdkeypath: str
-    hdmasterkeyid: str
+    address: Optional[str] = None
+    scriptPubKey: Optional[str] = None
+    ismine: Optional[bool] = None
+    iswatchonly: Optional[bool] = None
+    isscript: Optional[bool] = None
+    iswitness: Optional[bool] = None
+    pubkey: Optional[str] = None
+    iscompressed: Optional[bool] = None
+    account: Optional[str] = None
+    timestamp: Optional[int] = None
+    hdkeypath: Optional[str] = None
+    hdmasterkeyid: Optional[str] = None
+
+
+T = TypeVar('T')
+
+
+class RpcError(msgspec.Struct, gc=False):
+    code: int
+    message: str
+
+
+class RpcResponse(msgspec.Struct, Generic[T], gc=False):
+    """JSON-RPC response envelope, decoded together with its typed ``result``."""
+    result: Optional[T] = None
+    error: Optional[RpcError] = None
+    id: Union[int, str, None] = None
 
 
 WalletResponseType = TypeVar(
@@ -6,6 +6,7 @@ import array
 import asyncio
 import warnings
 import collections.abc
+from collections import OrderedDict
 from bisect import bisect_left
 from operator import attrgetter
 from base64 import b64encode
@@ -79,6 +80,25 @@ def cached_slot_property(name):
     return decorator
 
 
+class LRUCache(OrderedDict):
+    """Size bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize=128):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
 class SequenceProxy(collections.abc.Sequence):
     """Read-only proxy of a Sequence."""
     def __init__(self, proxied):
@@ -130,19 +150,27 @@ def deprecated(instead=None):
 
 
 def flatten_error_dict(d, key=''):
-    items = []
-    for k, v in d.items():
-        new_key = key + '.' + k if key else k
-        if isinstance(v, dict):
-            try:
-                _errors = v['_errors']
-            except KeyError:
-                items.extend(flatten_error_dict(v, new_key).items())
+    items = {}
+    # Iterators of the dicts currently being walked, so nested
+    # errors keep their order without recursing.
+    stack = [(key, iter(d.items()))]
+    while stack:
+        prefix, it = stack[-1]
+        for k, v in it:
+            new_key = prefix + '.' + k if prefix else k
+            if isinstance(v, dict):
+                try:
+                    _errors = v['_errors']
+                except KeyError:
+                    stack.append((new_key, iter(v.items())))
+                    break
+                else:
+                    items[new_key] = ' '.join(x.get('message', '') for x in _errors)
             else:
-                items.append((new_key, ' '.join(x.get('message', '') for x in _errors)))
+                items[new_key] = v
         else:
-            items.append((new_key, v))
-    return dict(items)
+            stack.pop()
+    return items
 
 
 def find(predicate, seq):
@@ -1,15 +1,38 @@
-from asyncio import create_subprocess_shell, Event
+from asyncio import create_subprocess_exec, Event
 from asyncio.subprocess import PIPE
-from os import getuid
+from os import getuid, stat
 from pwd import getpwuid
 from os import path
 
-from typing import Optional, Union
+from typing import Optional, Union, Dict, Tuple, List
 
 _pw = getpwuid(getuid())
 USER = _pw.pw_name
 HOME = _pw.pw_dir
 
+# path -> (mtime_ns, config lines), one entry per file, re-read once it changes
+_CFG_CACHE: Dict[str, Tuple[int, Tuple[bytes, ...]]] = {}
+
+
+def _read_config(cfg_path: str) -> Optional[List[bytes]]:
+    """Returns the lines of a config file as bytes, or ``None`` if it doesn't exist.
+
+    Every caller gets its own list, the cached lines are an immutable tuple.
+    """
+    try:
+        mtime = stat(cfg_path).st_mtime_ns
+    except FileNotFoundError:
+        _CFG_CACHE.pop(cfg_path, None)
+        return None
+    cached = _CFG_CACHE.get(cfg_path)
+    if cached is not None and cached[0] == mtime:
+        lines = cached[1]
+    else:
+        with open(cfg_path, 'rb') as cfg_file:
+            lines = tuple(cfg_file.read().splitlines())
+        _CFG_CACHE[cfg_path] = (mtime, lines)
+    return list(lines)
+
 
 class WalletDaemon:
     __slots__ = ('daemon_path', 'binary_name', 'client_path', 'name', 'cfg_file',
@@ -39,12 +62,7 @@ class WalletDaemon:
         if path.exists(f'{self.data_dir}/.lock'):
             self._data_dir_unlocked.set()
 
-        cfg_path = f'{self.data_dir}/{self.name}.conf'
-        self.cfg_file = None
-
-        if path.exists(cfg_path):
-            with open(cfg_path, 'rb') as cfg_file:
-                self.cfg_file = cfg_file.read().decode('utf-8').splitlines()
+        self.cfg_file: Optional[List[bytes]] = _read_config(f'{self.data_dir}/{self.name}.conf')
 
     @classmethod
     async def create(cls,
@@ -71,8 +89,8 @@ class WalletDaemon:
         return await self._exec_binary(['--help'])
 
     async def _exec_binary(self, opts: list[str], as_list=False) -> Union[list[str], str]:
-        cmd = f'{self.client_path if "stop" in opts else self.daemon_path} {" ".join(opts)}'
-        proc = await create_subprocess_shell(cmd=cmd, stdout=PIPE, stderr=PIPE)
+        binary = self.client_path if 'stop' in opts else self.daemon_path
+        proc = await create_subprocess_exec(binary, *opts, stdout=PIPE, stderr=PIPE)
         out, err = await proc.communicate()
         if err:
             raise Exception(f'{err.decode("utf-8")}')
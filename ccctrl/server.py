@@ -1,5 +1,6 @@
 import os
-from typing import Union
+from asyncio import gather
+from typing import Optional, Union
 from aiohttp import web
 from aiohttp.web_request import Request
 from aiohttp.web_response import Response
@@ -10,13 +11,29 @@ WS_FILE = os.path.join(os.path.dirname(__file__), "websocket.html")
 print(WS_FILE)
 bash_block_notify = '#!/bin/bash\ncurl "http://{host}:{port}/block" -d "$@"'
 
+# Contents of WS_FILE, read on the first plain HTTP request
+_ws_html: Optional[bytes] = None
+
+
+def _load_ws_html() -> bytes:
+    global _ws_html
+    if _ws_html is None:
+        with open(WS_FILE, "rb") as fp:
+            _ws_html = fp.read()
+    return _ws_html
+
+
+async def broadcast(sockets, data: Union[str, bytes], skip: Optional[WebSocketResponse] = None) -> None:
+    """Sends ``data`` to all ``sockets`` but ``skip`` concurrently, so one slow client doesn't hold up the rest."""
+    send = 'send_bytes' if isinstance(data, bytes) else 'send_str'
+    await gather(*[getattr(ws, send)(data) for ws in sockets if ws is not skip], return_exceptions=True)
+
 
 async def block_notify_handler(request: Request) -> Union[WebSocketResponse, Response]:
     resp = WebSocketResponse()
     available = resp.can_prepare(request)
     if not available:
-        with open(WS_FILE, "rb") as fp:
-            return Response(body=fp.read(), content_type="text/html")
+        return Response(body=_load_ws_html(), content_type="text/html")
 
     await resp.prepare(request)
 
@@ -24,15 +41,12 @@ async def block_notify_handler(request: Request) -> Union[WebSocketResponse, Res
 
     try:
         print("Someone joined.")
-        for ws in request.app["sockets"]:
-            await ws.send_str("Someone joined")
+        await broadcast(request.app["sockets"], "Someone joined")
         request.app["sockets"].append(resp)
 
         async for msg in resp:
             if msg.type == web.WSMsgType.BINARY:
-                for ws in request.app["sockets"]:
-                    if ws is not resp:
-                        await ws.send_str(msg.data)
+                await broadcast(request.app["sockets"], msg.data, skip=resp)
             else:
                 return resp
         return resp
@@ -40,8 +54,7 @@ async def block_notify_handler(request: Request) -> Union[WebSocketResponse, Res
     finally:
         request.app["sockets"].remove(resp)
         print("Someone disconnected.")
-        for ws in request.app["sockets"]:
-            await ws.send_str("Someone disconnected.")
+        await broadcast(request.app["sockets"], "Someone disconnected.")
 
 
 async def on_shutdown(app: web.Application) -> None:
@@ -48,10 +48,16 @@ class ExponentialBackoff:
     integral: :class:`bool`
         Set to ``True`` if whole periods of base is desirable, otherwise any
         number in between may be returned.
+    maximum: Optional[:class:`float`]
+        Upper bound of a delay in seconds, ``None`` leaves it at base * factor^10.
+    factor: :class:`int`
+        The growth factor of the delay per retry.
     """
 
-    def __init__(self, base=1, *, integral=False):
+    def __init__(self, base=1, *, integral=False, maximum=None, factor=2):
         self._base = base
+        self._factor = factor
+        self._maximum = maximum
 
         self._exp = 0
         self._max = 10
@@ -83,4 +89,7 @@ class ExponentialBackoff:
             self._exp = 0
 
         self._exp = min(self._exp + 1, self._max)
-        return self._randfunc(0, self._base * 2 ** self._exp)
+        upper = self._base * self._factor ** self._exp
+        if self._maximum is not None and upper > self._maximum:
+            upper = self._maximum
+        return self._randfunc(0, upper)
@@ -1,8 +1,7 @@
-import json
 import threading
 from asyncio import AbstractEventLoop, TimeoutError, Future
-from collections import namedtuple
-from logging import Logger
+from collections import defaultdict, namedtuple
+from logging import Logger, DEBUG
 
 import orjson
 from aiohttp import ClientWebSocketResponse, WSMessage, WSMsgType
@@ -14,11 +13,28 @@ from .keep_alive import KeepAliveHandler
 from .rate_limiter import GatewayRatelimiter
 
 
-def to_json(obj):
-    return json.dumps(obj, separators=(',', ':'), ensure_ascii=True)
+EventListener = namedtuple('EventListener', 'predicate event result future')
 
 
-EventListener = namedtuple('EventListener', 'predicate event result future')
+def peek_field(msg: Union[str, bytes], needle: str, limit: int = 96) -> Optional[str]:
+    """Returns the string value following ``needle``, e.g. ``'"table":"'``, in the
+    first ``limit`` characters of a raw frame, without parsing the JSON.
+
+    Only meant for keys an exchange sends ahead of the nested payload.
+    """
+    head = msg[:limit]
+    if not isinstance(head, str):
+        head = head.decode('utf-8', 'replace')
+    start = head.find(needle)
+    if start == -1:
+        return None
+    start += len(needle)
+    end = head.find('"', start)
+    return head[start:end] if end != -1 else None
+
+
+def _noop() -> None:
+    pass
 
 
 class EventType:
@@ -37,6 +53,9 @@ class _BaseWebSocket:
     SUBSCRIBE: int = None
     UNSUBSCRIBE: int = None
 
+    # Close codes after which reconnecting is pointless
+    _UNRECOVERABLE_CODES = frozenset({1000, 4004, 4010, 4011, 4012, 4013, 4014})
+
     def __init__(self, socket, *, loop):
         self.socket: ClientWebSocketResponse = socket
         self.loop: AbstractEventLoop = loop
@@ -45,8 +64,8 @@ class _BaseWebSocket:
         self.thread_id: int = threading.get_ident()
         self._keep_alive: Optional[KeepAliveHandler] = None
         self.parsers: Dict[str, Callable] = {}
-        # generic event listeners
-        self._dispatch_listeners: List[EventListener] = []
+        # generic event listeners, bucketed by event
+        self._dispatch_listeners: Dict[str, List[EventListener]] = defaultdict(list)
         self.max_heartbeat_timeout: Optional[Union[int, float]] = None
         # ws related stuff
         self.session_id: Optional[str] = None
@@ -55,6 +74,16 @@ class _BaseWebSocket:
         self.rate_limiter: Optional[GatewayRatelimiter] = None
         self.log: Optional[Logger] = None
 
+    @property
+    def _keep_alive(self) -> Optional[KeepAliveHandler]:
+        return self.__keep_alive
+
+    @_keep_alive.setter
+    def _keep_alive(self, handler: Optional[KeepAliveHandler]) -> None:
+        # Bound once, so received_message marks a frame with a single call
+        self.__keep_alive = handler
+        self._tick: Callable[[], None] = handler.tick if handler is not None else _noop
+
     @property
     def open(self) -> bool:
         return not self.socket.closed
@@ -79,7 +108,7 @@ class _BaseWebSocket:
 
         future = self.loop.create_future()
         entry = EventListener(event=event, predicate=predicate, result=result, future=future)
-        self._dispatch_listeners.append(entry)
+        self._dispatch_listeners[event].append(entry)
         return future
 
     def is_ratelimited(self) -> bool:
@@ -92,8 +121,7 @@ class _BaseWebSocket:
         pass
 
     def _can_handle_close(self) -> bool:
-        code = self._close_code or self.socket.close_code
-        return code not in (1000, 4004, 4010, 4011, 4012, 4013, 4014)
+        return (self._close_code or self.socket.close_code) not in self._UNRECOVERABLE_CODES
 
     async def poll_event(self) -> None:
         """Polls for a EVENT and handles the general gateway loop.
@@ -104,11 +132,9 @@ class _BaseWebSocket:
         """
         try:
             event: WSMessage = await self.socket.receive(timeout=self.max_heartbeat_timeout)
-            if event.type is WSMsgType.TEXT:
-                await self.received_message(event.data)
-            elif event.type is WSMsgType.BINARY:
-                await self.received_message(event.data)
-            elif event.type is WSMsgType.PONG:
+            msg_type = event.type
+            if msg_type is WSMsgType.TEXT or msg_type is WSMsgType.BINARY or msg_type is WSMsgType.PONG:
+                # Handed over as received, the parsers read str and bytes alike
                 await self.received_message(event.data)
             elif event.type is WSMsgType.ERROR:
                 self.log.debug('Received %s', event)
@@ -140,7 +166,8 @@ class _BaseWebSocket:
 
     async def send_as_json(self, data) -> None:
         try:
-            await self.send(to_json(data))
+            # orjson returns bytes, exchanges expect JSON commands as text frames
+            await self.send(orjson.dumps(data).decode('utf-8'))
         except RuntimeError as exc:
             if not self._can_handle_close():
                 raise ConnectionClosed(self.socket) from exc
@@ -153,7 +180,7 @@ class _BaseWebSocket:
         self._close_code = code
         await self.socket.close(code=code)
 
-    async def received_message(self, msg) -> None:
+    async def received_message(self, msg: Union[str, bytes]) -> None:
         pass
 
     @classmethod
@@ -180,33 +207,40 @@ class _BaseWebSocket:
     async def connect(self):
         msg: WSMessage = await self.socket.receive(timeout=self.max_heartbeat_timeout)
         self.dispatch('socket_raw_receive', msg)
-        msg = orjson.loads(msg.data)
-        self.log.debug(orjson.dumps(msg))
-
-    async def _remove_dispatched_listeners(self, event, data):
-        removed = []
-        for index, entry in enumerate(self._dispatch_listeners):
-            if entry.event != event:
-                continue
-
+        if self.log.isEnabledFor(DEBUG):
+            self.log.debug('Received %s', msg.data)
+
+    def _remove_dispatched_listeners(self, event, data):
+        # .get() so events without waiters don't grow the defaultdict
+        listeners = self._dispatch_listeners.get(event)
+        if not listeners:
+            return
+
+        # Compacts the bucket in place, keeping only the listeners still waiting
+        keep = 0
+        for entry in listeners:
             future = entry.future
             if future.cancelled():
-                removed.append(index)
                 continue
 
             try:
                 valid = entry.predicate(data)
             except Exception as exc:
                 future.set_exception(exc)
-                removed.append(index)
-            else:
-                if valid:
-                    if entry.result is None:
-                        ret = data
-                    else:
-                        ret = entry.result(data)
-                    future.set_result(ret)
-                    removed.append(index)
-
-        for index in reversed(removed):
-            del self._dispatch_listeners[index]
+                continue
+
+            if valid:
+                if entry.result is None:
+                    ret = data
+                else:
+                    ret = entry.result(data)
+                future.set_result(ret)
+                continue
+
+            listeners[keep] = entry
+            keep += 1
+
+        if keep:
+            del listeners[keep:]
+        else:
+            del self._dispatch_listeners[event]
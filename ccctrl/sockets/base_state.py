@@ -1,23 +1,24 @@
 import asyncio
-import gc
 import inspect
 import logging
 from asyncio import Task
-from weakref import WeakValueDictionary
-from collections import OrderedDict
 from os import urandom
 
 
 from typing import (
     Optional,
     Callable,
-    Dict, Union
+    Dict, Union, Any
 )
 
 from core.http import HttpClient
+from core.book import OrderBookTable, TradeTable
+from core.utils import LRUCache
 
 
 class ChunkRequest:
+    __slots__ = ('guild_id', 'resolver', 'loop', 'cache', 'nonce', 'buffer', 'waiters')
+
     def __init__(self, guild_id, loop, resolver, *, cache=True):
         self.guild_id = guild_id
         self.resolver = resolver
@@ -90,6 +91,9 @@ class ConnectionState:
 
         self.heartbeat_timeout: Union[int, float] = options.get('heartbeat_timeout', 6)
 
+        # Set by the exchange gateway whose instrument parsers fill it, see bitmex.gateway
+        self.instrument_table: Optional[Any] = None
+
         self.parsers = parsers = {}
         for attr, func in inspect.getmembers(self):
             if attr.startswith('parse_'):
@@ -100,20 +104,17 @@ class ConnectionState:
     def clear(self) -> None:
         """Resets ConnectionState to default values.
         """
-        self._markets = WeakValueDictionary()
+        self._markets: Dict[str, Any] = {}
 
-        # LRU of max size 128
-        self._market_tables = OrderedDict()
+        self._market_tables: LRUCache = LRUCache(maxsize=128)
 
+        # symbol -> numpy backed tables, allocated on a symbol's first update
         self._ticker_tables = {}
-        self._obook_tables = {}
-        self._trade_tables = {}
+        self._obook_tables: Dict[str, OrderBookTable] = {}
+        self._trade_tables: Dict[str, TradeTable] = {}
         self._cline_tables = {}
-
-        # In cases of large deallocations the GC should be called explicitly
-        # To free the memory more immediately, especially true when it comes
-        # to reconnect loops which cause mass allocations and deallocations.
-        gc.collect()
+        if self.instrument_table is not None:
+            self.instrument_table = type(self.instrument_table)()
 
     def call_handlers(self, key, *args, **kwargs):
         try:
@@ -158,13 +159,7 @@ class ConnectionState:
         self._markets[market.symbol] = market
 
     def _remove_market(self, market):
-        self._markets.pop(market.symbol, None)
-
-        del market
-        # Much like clear(), if we have a massive deallocation
-        # then it's better to explicitly call the GC
-        # in this case if all tables of all symbols of an exchange get rm'd
-        gc.collect()
+        del self._markets[market.symbol]
 
     def parse_ready(self, data):
         if self._ready_task is not None:
@@ -175,14 +170,6 @@ class ConnectionState:
 
         self.dispatch('connect')
 
-        # Much like clear(), if we have a massive deallocation
-        # then it's better to explicitly call the GC
-        # Note that in the original ready parsing code this was done
-        # implicitly via clear() but in the auto sharded client clearing
-        # the cache would have the consequence of clearing data on other
-        # shards as well.
-        gc.collect()
-
         if self._ready_task is None:
             self._ready_task = asyncio.ensure_future(self._delay_ready(), loop=self.loop)
 
@@ -193,11 +180,34 @@ class ConnectionState:
 
     def parse_kline_update(self, data):
         print('KLINE UPDATE', data)
-        timestamp: int = data['E']
+        timestamp: int = data.event_time
 
     def parse_depth_update(self, data):
-        print('DEPTH UPDATE', data)
+        try:
+            book = self._obook_tables[data.symbol]
+        except KeyError:
+            book = self._obook_tables[data.symbol] = OrderBookTable()
+        book.update(data.bids, data.asks, data.event_time)
 
     def parse_ticker_update(self, data):
         print('TICKER UPDATE', data)
 
+    def parse_trade_update(self, data):
+        try:
+            trades = self._trade_tables[data.symbol]
+        except KeyError:
+            trades = self._trade_tables[data.symbol] = TradeTable()
+        trades.append(float(data.price), float(data.quantity), data.trade_time)
+
+    # Bitmex Table Parsers, called once per frame with its list of rows
+
+    def parse_instrument_partial(self, rows):
+        self.instrument_table.update_rows(rows)
+
+    parse_instrument_insert = parse_instrument_update = parse_instrument_partial
+
+    def parse_instrument_delete(self, rows):
+        table = self.instrument_table
+        for row in rows:
+            if row['symbol'] in table.symbol_idx:
+                table.remove(row['symbol'])
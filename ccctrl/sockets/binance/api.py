@@ -1,6 +1,4 @@
-import hashlib
-import hmac
-from operator import itemgetter
+from hmac import HMAC
 
 from core.http import HttpClient
 from sockets.client import _BaseClient
@@ -11,31 +9,18 @@ class Api:
     def __init__(self, client: _BaseClient, key: str, secret: str):
         self.api: HttpClient = client.http
         self.key, self.secret = key, secret
-
-    def _generate_signature(self, data, secret):
-
-        ordered_data = self._order_params(data)
-        query_string = '&'.join(["{}={}".format(d[0], d[1]) for d in ordered_data])
-        m = hmac.new(secret.encode('utf-8'), query_string.encode('utf-8'), hashlib.sha256)
-        return m.hexdigest()
-
-    def _order_params(self, data):
-        """Convert params to list with signature as last element
-        :param data:
-        :return:
-        """
-        has_signature = False
-        params = []
-        for key, value in data.items():
-            if key == 'signature':
-                has_signature = True
-            else:
-                params.append((key, value))
-        # sort parameters by key
-        params.sort(key=itemgetter(0))
-        if has_signature:
-            params.append(('signature', data['signature']))
-        return params
+        self.secret_bytes: bytes = secret.encode('utf-8')
+        # Keyed once, the ipad/opad blocks are already hashed into its inner and outer states
+        self._hmac: HMAC = HMAC(self.secret_bytes, digestmod='sha256')
+
+    def _generate_signature(self, data):
+        """Signs the request params, sorted by key with an existing ``signature`` kept last."""
+        items = sorted([item for item in data.items() if item[0] != 'signature'])
+        if 'signature' in data:
+            items.append(('signature', data['signature']))
+        mac = self._hmac.copy()
+        mac.update('&'.join([f'{k}={v}' for k, v in items]).encode('utf-8'))
+        return mac.hexdigest()
 
     async def load_markets(
         self,
@@ -1,28 +1,19 @@
-from enum import Enum
-from typing import Dict, Union, Callable
+from itertools import count
+from typing import Dict, List, Optional, Callable, Tuple, Union
 
+import msgspec
 import orjson
 
 from asyncio import AbstractEventLoop
-from logging import getLogger
+from logging import getLogger, DEBUG
 
 from aiohttp import ClientWebSocketResponse
 
-from sockets.base_gateway import _BaseWebSocket
+from sockets.base_gateway import _BaseWebSocket, peek_field
 
 from sockets.rate_limiter import GatewayRatelimiter
 from sockets.keep_alive import KeepAliveHandler
-
-
-class EventType(Enum):
-    DEPTH_UPDATE = 'depth'
-    KLINE_UPDATE = 'kline'
-    TICKER_UPDATE = 'ticker'
-    TRADE_UPDATE = 'trade'
-
-
-async def parse_event(stream):
-    pass
+from sockets.binance.models import EVENT_NAMES, STREAM_EVENTS, stream_decoder
 
 
 class WebSocket(_BaseWebSocket):
@@ -36,66 +27,105 @@ class WebSocket(_BaseWebSocket):
     SUBSCRIBE = 'SUBSCRIBE'
     UNSUBSCRIBE = 'UNSUBSCRIBE'
 
+    _TOPICS = ('@trade', '@depth', '@kline_1h', '@ticker')
+    # market -> its stream names, shared by all sockets so reconnects reuse them
+    _sub_cache: Dict[str, List[str]] = {}
+
     def __init__(self, socket: ClientWebSocketResponse, *, loop: AbstractEventLoop):
         super().__init__(socket, loop=loop)
         self.rate_limiter = GatewayRatelimiter(5, 1)
         self._keep_alive = KeepAliveHandler(ws=self)
         self.log = getLogger(__name__)
-        self._counter = 0
+        # request ids, Binance echoes them back in the reply
+        self._ids = count(1)
 
     @property
-    def counter(self):
-        self._counter += 1
-        return self._counter
+    def parsers(self) -> Dict[str, Callable]:
+        return self._parsers
+
+    @parsers.setter
+    def parsers(self, parsers: Dict[str, Callable]) -> None:
+        # payload type -> (event name, parser), so a frame is dispatched with one lookup
+        self._parsers = parsers
+        self._dispatch: Dict[type, Tuple[str, Optional[Callable]]] = {
+            cls: (event, parsers.get(event)) for cls, event in EVENT_NAMES.items()
+        }
+        # stream name -> event name, for streams that may be dropped unparsed
+        self._stream_events: Dict[str, Optional[str]] = {}
 
     async def subscribe(self, market):
-        market = market.lower()
+        await self.subscribe_many([market])
+
+    async def subscribe_many(self, markets):
+        """Subscribes to the streams of all ``markets`` with a single frame."""
+        cache = self._sub_cache
+        params = []
+        for market in markets:
+            try:
+                streams = cache[market]
+            except KeyError:
+                m = market.lower()
+                streams = cache[market] = [m + topic for topic in self._TOPICS]
+            params += streams
+
         payload = {
             "method": self.SUBSCRIBE,
-            "params": [
-                f"{market}@trade",
-                f"{market}@depth",
-                f"{market}@kline_1h",
-                f"{market}@ticker",
-            ],
-            "id": self._counter
+            "params": params,
+            "id": next(self._ids)
         }
-        await self.socket.send_json(payload)
+        await self.socket.send_str(orjson.dumps(payload).decode('utf-8'))
 
     async def unsubscribe(self, session_id, subscription_topic=None, market=None):
         payload = {
-            "method": self.SUBSCRIBE,
+            "method": self.UNSUBSCRIBE,
             "params": [
                 f"{market}@{subscription_topic}",
             ],
-            "id": self._counter
+            "id": next(self._ids)
         }
-        await self.socket.send_json(payload)
+        await self.socket.send_str(orjson.dumps(payload).decode('utf-8'))
 
-    async def received_message(self, msg) -> None:
-
-        msg = orjson.loads(msg)
-        self.log.debug(orjson.dumps(msg))
-
-        if msg.get('results', False):
-            print(msg['results'])
+    def _unhandled(self, stream: str) -> bool:
+        """Whether a stream's frames have neither a parser nor anyone waiting for them."""
+        try:
+            event = self._stream_events[stream]
+        except KeyError:
+            kind = stream[stream.find('@') + 1:]
+            for sep in ('_', '@'):
+                kind = kind.partition(sep)[0]
+            event = self._stream_events[stream] = STREAM_EVENTS.get(kind)
+        if event is None:
+            return False
+        return event not in self._parsers and not self._dispatch_listeners.get(event)
+
+    async def received_message(self, msg: Union[str, bytes]) -> None:
+        if self.log.isEnabledFor(DEBUG):
+            self.log.debug('Received %s', msg)
+
+        stream = peek_field(msg, '"stream":"')
+        if stream is not None and self._unhandled(stream):
+            self._tick()
             return
 
-        if self._keep_alive:
-            self._keep_alive.tick()
-
-        symbol, topic = msg['stream'].split('@')
-        data: Dict[Union[int, float, str, bool]] = msg['data']
+        try:
+            msg = stream_decoder.decode(msg)
+        except msgspec.DecodeError as exc:
+            # Also covers ValidationError, malformed JSON is dropped like an unknown payload
+            self.log.debug('Undecodable stream payload: %s.', exc)
+            return
 
-        topic: str = topic if 'kline' not in topic else topic[:-3]
+        data = msg.data
+        if data is None:
+            self.log.debug('Request %s answered with %s.', msg.id, msg.result)
+            return
 
-        event: str = EventType(topic).name
+        self._tick()
 
-        try:
-            func: Callable = self.parsers[event]
-        except KeyError:
+        event, func = self._dispatch[type(data)]
+        if func is None:
             self.log.debug('Unknown event %s.', event)
         else:
             func(data)
 
-        await self._remove_dispatched_listeners(event, data)
+        if self._dispatch_listeners:
+            self._remove_dispatched_listeners(event, data)
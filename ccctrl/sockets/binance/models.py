@@ -0,0 +1,90 @@
+from typing import List, Optional, Union
+
+import msgspec
+
+
+class _BinanceEvent(msgspec.Struct, tag_field='e', gc=False):
+    event_time: int = msgspec.field(name='E')
+    symbol: str = msgspec.field(name='s')
+
+
+class Kline(msgspec.Struct, gc=False):
+    start_time: int = msgspec.field(name='t')
+    close_time: int = msgspec.field(name='T')
+    interval: str = msgspec.field(name='i')
+    open: str = msgspec.field(name='o')
+    close: str = msgspec.field(name='c')
+    high: str = msgspec.field(name='h')
+    low: str = msgspec.field(name='l')
+    volume: str = msgspec.field(name='v')
+    trades: int = msgspec.field(name='n')
+    closed: bool = msgspec.field(name='x')
+    quote_volume: str = msgspec.field(name='q')
+
+
+class KlineEvent(_BinanceEvent, tag='kline', gc=False):
+    """Payload of a ``<symbol>@kline_<interval>`` stream."""
+    kline: Kline = msgspec.field(name='k')
+
+
+class DepthEvent(_BinanceEvent, tag='depthUpdate', gc=False):
+    """Payload of a ``<symbol>@depth`` stream, bids and asks as ``[price, quantity]``."""
+    first_update_id: int = msgspec.field(name='U')
+    final_update_id: int = msgspec.field(name='u')
+    bids: List[List[str]] = msgspec.field(name='b')
+    asks: List[List[str]] = msgspec.field(name='a')
+
+
+class TickerEvent(_BinanceEvent, tag='24hrTicker', gc=False):
+    """Payload of a ``<symbol>@ticker`` stream."""
+    price_change: str = msgspec.field(name='p')
+    price_change_percent: str = msgspec.field(name='P')
+    weighted_avg_price: str = msgspec.field(name='w')
+    last_price: str = msgspec.field(name='c')
+    best_bid: str = msgspec.field(name='b')
+    best_ask: str = msgspec.field(name='a')
+    open: str = msgspec.field(name='o')
+    high: str = msgspec.field(name='h')
+    low: str = msgspec.field(name='l')
+    volume: str = msgspec.field(name='v')
+    quote_volume: str = msgspec.field(name='q')
+    trades: int = msgspec.field(name='n')
+
+
+class TradeEvent(_BinanceEvent, tag='trade', gc=False):
+    """Payload of a ``<symbol>@trade`` stream."""
+    trade_id: int = msgspec.field(name='t')
+    price: str = msgspec.field(name='p')
+    quantity: str = msgspec.field(name='q')
+    trade_time: int = msgspec.field(name='T')
+    buyer_is_maker: bool = msgspec.field(name='m')
+
+
+MarketEvent = Union[KlineEvent, DepthEvent, TickerEvent, TradeEvent]
+
+
+class StreamMessage(msgspec.Struct, gc=False):
+    """A frame of a combined stream, or the reply to a (un)subscribe request."""
+    stream: Optional[str] = None
+    data: Optional[MarketEvent] = None
+    result: Optional[List[str]] = None
+    id: Optional[int] = None
+
+
+# Parser name in ConnectionState.parsers for every stream payload type
+EVENT_NAMES = {
+    KlineEvent: 'KLINE_UPDATE',
+    DepthEvent: 'DEPTH_UPDATE',
+    TickerEvent: 'TICKER_UPDATE',
+    TradeEvent: 'TRADE_UPDATE',
+}
+
+# Event name by stream type, the part of a stream name after the symbol
+STREAM_EVENTS = {
+    'kline': 'KLINE_UPDATE',
+    'depth': 'DEPTH_UPDATE',
+    'ticker': 'TICKER_UPDATE',
+    'trade': 'TRADE_UPDATE',
+}
+
+stream_decoder = msgspec.json.Decoder(StreamMessage)
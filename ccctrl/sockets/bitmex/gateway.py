@@ -1,10 +1,12 @@
 import orjson
-from logging import getLogger
+from typing import Callable, Dict, Optional, Tuple, Union
+from logging import getLogger, DEBUG
 
 from aiohttp import WSMessage
 
-from ..base_gateway import _BaseWebSocket
+from ..base_gateway import _BaseWebSocket, peek_field
 from ..rate_limiter import GatewayRatelimiter
+from .instrument import BitmexInstrumentTable
 
 log = getLogger(__name__)
 
@@ -29,6 +31,29 @@ class WebSocket(_BaseWebSocket):
         self._rate_limiter = GatewayRatelimiter()
         self.log = getLogger(__name__)
 
+    @classmethod
+    async def from_client(cls, client, **kwargs):
+        # The shared state stays exchange agnostic, the table its instrument parsers fill is set here
+        state = client.connection
+        if state.instrument_table is None:
+            state.instrument_table = BitmexInstrumentTable()
+        return await super().from_client(client, **kwargs)
+
+    @property
+    def parsers(self) -> Dict[str, Callable]:
+        return self._parsers
+
+    @parsers.setter
+    def parsers(self, parsers: Dict[str, Callable]) -> None:
+        self._parsers = parsers
+        # table -> action -> (event name, parser), filled as tables show up
+        self._dispatch: Dict[str, Dict[str, Tuple[str, Optional[Callable]]]] = {}
+
+    def _resolve(self, table: str, action: str) -> Tuple[str, Optional[Callable]]:
+        event = f'{table.upper()}_{action.upper()}'
+        entry = self._dispatch.setdefault(table, {})[action] = (event, self._parsers.get(event))
+        return entry
+
     async def subscribe(self, market):
         payload = [
             self.MESSAGE,
@@ -38,7 +63,7 @@ class WebSocket(_BaseWebSocket):
                 f":{market.upper()}"
             ]}
         ]
-        await self.socket.send_json(payload)
+        await self.socket.send_str(orjson.dumps(payload).decode('utf-8'))
 
     async def unsubscribe(self, shard_id, session_id, subscription_topic=None, market=None):
         payload = [
@@ -53,18 +78,34 @@ class WebSocket(_BaseWebSocket):
         if subscription_topic and market:
             payload[-1]['args'] = payload[-1]['args'] + f":{market.UPPER}"
 
-        await self.socket.send_json(payload)
+        await self.socket.send_str(orjson.dumps(payload).decode('utf-8'))
+
+    def _unhandled(self, table: str, action: str) -> bool:
+        """Whether a table action has neither a parser nor anyone waiting for it."""
+        try:
+            event, func = self._dispatch[table][action]
+        except KeyError:
+            event, func = self._resolve(table, action)
+        return func is None and not self._dispatch_listeners.get(event)
+
+    async def received_message(self, msg: Union[str, bytes]):
+
+        if log.isEnabledFor(DEBUG):
+            log.debug('Received %s', msg)
 
-    async def received_message(self, msg):
+        table = peek_field(msg, '"table":"')
+        if table is not None:
+            action = peek_field(msg, '"action":"')
+            if action is not None and self._unhandled(table, action):
+                self._tick()
+                return
 
         msg = orjson.loads(msg)
-        log.debug(orjson.dumps(msg))
 
         op = msg[0]
         payload = msg[3]
 
-        if self._keep_alive:
-            self._keep_alive.tick()
+        self._tick()
 
         if op == self.UNSUBSCRIBE:
             log.info('Shard ID %s topic unsubscribed %s.', self.shard_id, self.session_id)
@@ -76,22 +117,24 @@ class WebSocket(_BaseWebSocket):
 
         table, action, data = payload['table'], payload['action'], payload['data']
 
-        event = f'{table.upper()}_{action.upper()}'
-
         try:
-            func = self.parsers[event]
+            event, func = self._dispatch[table][action]
         except KeyError:
+            event, func = self._resolve(table, action)
+
+        if func is None:
             log.debug('Unknown event %s.', event)
-        else:
-            while data:
-                func(data.pop())
+        elif data:
+            # Parsers take the whole row list and must not consume it, listeners get it next
+            func(data)
 
-        await self._remove_dispatched_listeners(event, data)
+        if self._dispatch_listeners:
+            self._remove_dispatched_listeners(event, data)
 
     async def connect(self) -> None:
         await self.subscribe('xbtusdt')
         await self.send_as_json([self.SUBSCRIBE, self.shard_id, self.session_id])
         msg: WSMessage = await self.socket.receive(timeout=self.max_heartbeat_timeout)
         self.dispatch('socket_raw_receive', msg)
-        msg = orjson.loads(msg.data)
-        self.log.debug(orjson.dumps(msg))
+        if self.log.isEnabledFor(DEBUG):
+            self.log.debug('Received %s', msg.data)
@@ -1,21 +1,37 @@
-import datetime
+from calendar import timegm
+from typing import Dict, List
 
-from dataclassy import dataclass
+import numpy as np
+from numpy import ndarray
+
+
+# Bitmex sends intervals as a date after 2000-01-01
+_INTERVAL_EPOCH_NS = 946684800 * 1_000_000_000
+
+
+def _parse_timestamp(ts: str) -> int:
+    """Parses Bitmex's fixed ``YYYY-MM-DDTHH:MM:SS.mmmZ`` format to nanoseconds since the epoch."""
+    seconds = timegm((int(ts[0:4]), int(ts[5:7]), int(ts[8:10]), int(ts[11:13]), int(ts[14:16]), int(ts[17:19])))
+    millis = int(ts[20:23]) if len(ts) > 20 else 0
+    return seconds * 1_000_000_000 + millis * 1_000_000
 
 
-@dataclass(slots=True, frozen=True, kwargs=True, init=True)
 class BitmexInstrument:
+    """A Bitmex instrument, fields missing from the payload are ``None``.
+
+    Timestamps are nanoseconds since the epoch, ``*Interval`` fields durations in nanoseconds.
+    """
     symbol: str
-    timestamp: datetime.datetime
+    timestamp: int
     rootSymbol: str
     state: str
     typ: str
-    listing: datetime.datetime
-    front: datetime.datetime
-    expiry: datetime.datetime
-    settle: datetime.datetime
-    listedSettle: datetime.datetime
-    relistInterval: datetime.datetime
+    listing: int
+    front: int
+    expiry: int
+    settle: int
+    listedSettle: int
+    relistInterval: int
     inverseLeg: str
     sellLeg: str
     buyLeg: str
@@ -29,9 +45,9 @@ class BitmexInstrument:
     underlyingSymbol: str
     reference: str
     referenceSymbol: str
-    calcInterval: datetime.datetime
-    publishInterval: datetime.datetime
-    publishTime: datetime.datetime
+    calcInterval: int
+    publishInterval: int
+    publishTime: int
     maxOrderQty: float
     maxPrice: float
     lotSize: float
@@ -58,15 +74,15 @@ class BitmexInstrument:
     fundingBaseSymbol: str
     fundingQuoteSymbol: str
     fundingPremiumSymbol: str
-    fundingTimestamp: datetime.datetime
-    fundingInterval: datetime.datetime
+    fundingTimestamp: int
+    fundingInterval: int
     fundingRate: float
     indicativeFundingRate: float
-    rebalanceTimestamp: datetime.datetime
-    rebalanceInterval: datetime.datetime
-    openingTimestamp: datetime.datetime
-    closingTimestamp: datetime.datetime
-    sessionInterval: datetime.datetime
+    rebalanceTimestamp: int
+    rebalanceInterval: int
+    openingTimestamp: int
+    closingTimestamp: int
+    sessionInterval: int
     prevClosePrice: float
     limitDownPrice: float
     limitUpPrice: float
@@ -111,12 +127,129 @@ class BitmexInstrument:
     settledPriceAdjustmentRate: float
     settledPrice: float
 
-    def __setitem__(self, floor_number, data):
-        self._floors[floor_number] = data
+    __slots__ = ('symbol', 'timestamp', 'rootSymbol', 'state', 'typ', 'listing', 'front', 'expiry',
+                 'settle', 'listedSettle', 'relistInterval', 'inverseLeg', 'sellLeg', 'buyLeg',
+                 'optionStrikePcnt', 'optionStrikeRound', 'optionStrikePrice', 'optionMultiplier',
+                 'positionCurrency', 'underlying', 'quoteCurrency', 'underlyingSymbol',
+                 'reference', 'referenceSymbol', 'calcInterval', 'publishInterval', 'publishTime',
+                 'maxOrderQty', 'maxPrice', 'lotSize', 'tickSize', 'multiplier', 'settlCurrency',
+                 'underlyingToPositionMultiplier', 'underlyingToSettleMultiplier',
+                 'quoteToSettleMultiplier', 'isQuanto', 'isInverse', 'initMargin', 'maintMargin',
+                 'riskLimit', 'riskStep', 'limit', 'capped', 'taxed', 'deleverage', 'makerFee',
+                 'takerFee', 'settlementFee', 'insuranceFee', 'fundingBaseSymbol',
+                 'fundingQuoteSymbol', 'fundingPremiumSymbol', 'fundingTimestamp',
+                 'fundingInterval', 'fundingRate', 'indicativeFundingRate', 'rebalanceTimestamp',
+                 'rebalanceInterval', 'openingTimestamp', 'closingTimestamp', 'sessionInterval',
+                 'prevClosePrice', 'limitDownPrice', 'limitUpPrice', 'bankruptLimitDownPrice',
+                 'bankruptLimitUpPrice', 'prevTotalVolume', 'totalVolume', 'volume', 'volume24h',
+                 'prevTotalTurnover', 'totalTurnover', 'turnover', 'turnover24h',
+                 'homeNotional24h', 'foreignNotional24h', 'prevPrice24h', 'vwap', 'highPrice',
+                 'lowPrice', 'lastPrice', 'lastPriceProtected', 'lastTickDirection',
+                 'lastChangePcnt', 'bidPrice', 'midPrice', 'askPrice', 'impactBidPrice',
+                 'impactMidPrice', 'impactAskPrice', 'hasLiquidity', 'openInterest', 'openValue',
+                 'fairMethod', 'fairBasisRate', 'fairBasis', 'fairPrice', 'markMethod',
+                 'markPrice', 'indicativeTaxRate', 'indicativeSettlePrice',
+                 'optionUnderlyingPrice', 'settledPriceAdjustmentRate', 'settledPrice')
 
-    def __getitem__(self, floor_number):
-        return self._floors[floor_number]
+    def __init__(self, **data):
+        for name in self.__slots__:
+            setattr(self, name, None)
+        self._update(data)
 
     def _update(self, data):
+        # Plain setattr on purpose, the interpreter specializes it for slots, going
+        # through a table of the slot descriptors' __set__ measured ~60% slower.
+        fields, times, intervals = _FIELDS, _TIMESTAMP_FIELDS, _INTERVAL_FIELDS
         for k, v in data.items():
-            setattr(self, k, v)
+            if k in fields:
+                if v is not None and k in times:
+                    v = _parse_timestamp(v)
+                    if k in intervals:
+                        v -= _INTERVAL_EPOCH_NS
+                setattr(self, k, v)
+
+    def __repr__(self):
+        return f'<BitmexInstrument {self.symbol}>'
+
+
+_FIELDS = frozenset(BitmexInstrument.__slots__)
+_TIMESTAMP_FIELDS = frozenset(name for name, tp in BitmexInstrument.__annotations__.items() if tp is int)
+_INTERVAL_FIELDS = frozenset(name for name in _TIMESTAMP_FIELDS if name.endswith('Interval'))
+
+
+# Fields kept as columns in BitmexInstrumentTable
+NUMERIC_FIELDS = tuple(name for name, tp in BitmexInstrument.__annotations__.items() if tp is float)
+
+
+class BitmexInstrumentTable:
+    """Numeric instrument fields of all symbols, one ``float64`` column per field
+    with a row per symbol, so fleet wide scans like all mark prices are single
+    vectorized operations. Missing values are ``nan``.
+    """
+
+    __slots__ = ('symbol_idx', 'columns', '_capacity')
+
+    def __init__(self, capacity: int = 64):
+        self.symbol_idx: Dict[str, int] = {}
+        self.columns: Dict[str, ndarray] = {name: np.full(capacity, np.nan) for name in NUMERIC_FIELDS}
+        self._capacity: int = capacity
+
+    def __len__(self):
+        return len(self.symbol_idx)
+
+    def __getitem__(self, field: str) -> ndarray:
+        return self.columns[field][:len(self.symbol_idx)]
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self.symbol_idx)
+
+    def _row(self, symbol: str) -> int:
+        try:
+            return self.symbol_idx[symbol]
+        except KeyError:
+            row = len(self.symbol_idx)
+            if row == self._capacity:
+                self._grow()
+            self.symbol_idx[symbol] = row
+            return row
+
+    def _grow(self) -> None:
+        capacity = self._capacity * 2
+        for name, col in self.columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[:self._capacity] = col
+            self.columns[name] = grown
+        self._capacity = capacity
+
+    def update(self, data: dict) -> None:
+        """Stores the numeric fields of an instrument row, other fields are ignored."""
+        row = self._row(data['symbol'])
+        columns = self.columns
+        for k, v in data.items():
+            col = columns.get(k)
+            if col is not None:
+                col[row] = np.nan if v is None else v
+
+    def update_rows(self, rows: List[dict]) -> None:
+        """Stores a frame of instrument rows, each column is written with one scatter."""
+        if not rows:
+            return
+        idx = np.fromiter((self._row(r['symbol']) for r in rows), dtype=np.intp, count=len(rows))
+        columns = self.columns
+        for name in {k for r in rows for k in r if k in columns}:
+            present = [i for i, r in enumerate(rows) if name in r]
+            values = [rows[i][name] for i in present]
+            columns[name][idx[present]] = np.array(values, dtype=np.float64)
+
+    def remove(self, symbol: str) -> None:
+        """Drops a symbol, the last row is moved into its place."""
+        row = self.symbol_idx.pop(symbol)
+        last = len(self.symbol_idx)
+        if row != last:
+            for col in self.columns.values():
+                col[row] = col[last]
+            moved = next(s for s, i in self.symbol_idx.items() if i == last)
+            self.symbol_idx[moved] = row
+        for col in self.columns.values():
+            col[last] = np.nan
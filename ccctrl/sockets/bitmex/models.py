@@ -2,8 +2,8 @@
 
 class _RawReprMixin:
     def __repr__(self):
-        value = ' '.join('%s=%r' % (attr, getattr(self, attr)) for attr in self.__slots__)
-        return '<%s %s>' % (self.__class__.__name__, value)
+        # Only the size of the payload, order books are far too big for debug logs
+        return f'<{type(self).__name__} symbol={self.symbol!r} rows={len(self.data)}>'
 
 
 class BitmexInstrumentUpdateEvent(_RawReprMixin):
@@ -19,3 +19,8 @@ class BitmexInstrumentUpdateEvent(_RawReprMixin):
 
 class BitmexOrderBookUpdateEvent(_RawReprMixin):
     __slots__ = ('symbol', 'data', 'cached_table')
+
+    def __init__(self, data):
+        self.symbol = data['symbol']
+        self.data = data
+        self.cached_table = None
@@ -1,33 +1,51 @@
 # -*- coding: utf-8 -*-
 
 import asyncio
+import gc
 import logging
 import sys
 import signal
 import traceback
-from typing import Optional, Union, Coroutine
+import weakref
+from collections import defaultdict
+from itertools import count
+from typing import Optional, Union
 
+import uvloop
 from aiohttp import ClientError
-from discord import ConnectionClosed, GatewayNotFound
-from discord.backoff import ExponentialBackoff
 
 from core.http import HttpClient
-from core.errors import HTTPException
+from core.errors import ConnectionClosed, GatewayNotFound, HTTPException
 from core.errors import ReconnectWebSocket
+from sockets.backoff import ExponentialBackoff
 from sockets.base_state import ConnectionState
 from sockets.binance.gateway import WebSocket
 
 log = logging.getLogger(__name__)
 
+_MISSING = object()
 
-def _cancel_tasks(loop):
+# asyncio.timeout() replaces wait_for() for the connect timeout where available
+_HAS_TIMEOUT = sys.version_info >= (3, 11)
+
+
+def _default_loop() -> asyncio.AbstractEventLoop:
+    """The running loop if there is one, otherwise a new uvloop loop set as the current loop."""
     try:
-        task_retriever = asyncio.Task.all_tasks
-    except AttributeError:
-        # future proofing for 3.9 I guess
-        task_retriever = asyncio.all_tasks
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        loop = uvloop.new_event_loop()
+        asyncio.set_event_loop(loop)
+        return loop
+
+
+# Upper bound on how long shutdown waits for cancelled tasks to unwind
+CANCEL_TIMEOUT = 5.0
+
 
-    tasks = {t for t in task_retriever(loop=loop) if not t.done()}
+def _cancel_tasks(loop):
+    current = asyncio.current_task(loop)
+    tasks = {t for t in asyncio.all_tasks(loop) if not t.done() and t is not current}
 
     if not tasks:
         return
@@ -36,11 +54,15 @@ def _cancel_tasks(loop):
     for task in tasks:
         task.cancel()
 
-    loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
-    log.info('All tasks finished cancelling.')
+    # asyncio.wait() rather than wait_for(gather()), which would wait out a task ignoring the cancel
+    _, pending = loop.run_until_complete(asyncio.wait(tasks, timeout=CANCEL_TIMEOUT))
+    if pending:
+        log.warning('%d tasks still running after %.1fs, closing anyway.', len(pending), CANCEL_TIMEOUT)
+    else:
+        log.info('All tasks finished cancelling.')
 
     for task in tasks:
-        if task.cancelled():
+        if task.cancelled() or not task.done():
             continue
         if task.exception() is not None:
             loop.call_exception_handler({
@@ -53,28 +75,20 @@ def _cancel_tasks(loop):
 def _cleanup_loop(loop):
     try:
         _cancel_tasks(loop)
-        if sys.version_info >= (3, 6):
-            loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())
     finally:
         log.info('Closing the event loop.')
         loop.close()
 
 
-class _ClientEventTask(asyncio.Task):
-    def __init__(self, original_coro, event_name, coro, *, loop):
-        super().__init__(coro, loop=loop)
-        self.__event_name = event_name
-        self.__original_coro = original_coro
-
-    def __repr__(self):
-        info = [
-            ('state', self._state.lower()),
-            ('event', self.__event_name),
-            ('coro', repr(self.__original_coro)),
-        ]
-        if self._exception is not None:
-            info.append(('exception', repr(self._exception)))
-        return '<ClientEventTask {}>'.format(' '.join('%s=%s' % t for t in info))
+def _print_event_exception(task):
+    if task.cancelled():
+        return
+    exc = task.exception()
+    if exc is not None:
+        print('Ignoring exception in {}'.format(task.get_name()), file=sys.stderr)
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
 
 
 class _BaseClient:
@@ -109,10 +123,26 @@ class _BaseClient:
         The event loop that the client uses for HTTP requests and websocket operations.
 
     """
+    # Reconnect delays, the n-th retry waits up to BACKOFF_INITIAL * BACKOFF_FACTOR^n seconds
+    BACKOFF_INITIAL: float = 1.0
+    BACKOFF_MAX: float = 1024.0
+    BACKOFF_FACTOR: int = 2
+
+    # __dict__ stays, event() registers handlers as instance attributes
+    __slots__ = ('ws', 'loop', '_listeners', '_wait_counter', '_listener_count', '_event_handlers', 'http',
+                 '_handlers', '_hooks', 'connection', '_closed', '_ready', '_default_on_error', '_bg_tasks',
+                 '__dict__')
+
     def __init__(self, loop=None, **options):
         self.ws = None
-        self.loop: asyncio.AbstractEventLoop = asyncio.get_event_loop() if loop is None else loop
-        self._listeners = {}
+        self.loop: asyncio.AbstractEventLoop = _default_loop() if loop is None else loop
+        # event -> {waiter id: (future, check)}, ids only grow so dict order is arrival order
+        self._listeners = defaultdict(dict)
+        self._wait_counter = count()
+        # waiters across all buckets, lets dispatch skip the listener lookup when zero
+        self._listener_count = 0
+        # event -> (bound on_<event> coroutine, its name), or None without a handler
+        self._event_handlers = {}
 
         connector = options.pop('connector', None)
         proxy = options.pop('proxy', None)
@@ -130,7 +160,12 @@ class _BaseClient:
 
         self.connection: ConnectionState = self._get_state(**options)
         self._closed = False
-        self._ready = asyncio.Event()
+        # one-shot latch, replaced by a fresh future on close()
+        self._ready: asyncio.Future = self.loop.create_future()
+        # Without an on_error override, events are scheduled without the _run_event wrapper
+        self._default_on_error: bool = type(self).on_error is _BaseClient.on_error
+        # event tasks still running, finished ones drop out on their own
+        self._bg_tasks: "weakref.WeakSet[asyncio.Task]" = weakref.WeakSet()
         self.connection._get_websocket = self._get_websocket
         self.connection._get_client = lambda: self
 
@@ -147,7 +182,8 @@ class _BaseClient:
         await self.ws.request_sync(guilds)
 
     def _handle_ready(self):
-        self._ready.set()
+        if not self._ready.done():
+            self._ready.set_result(None)
 
     @property
     def latency(self):
@@ -197,14 +233,17 @@ class _BaseClient:
         if self.http is None:
             self.http = await HttpClient.create_client(loop=self.loop, **options)
 
-        backoff = ExponentialBackoff()
+        backoff = ExponentialBackoff(self.BACKOFF_INITIAL, maximum=self.BACKOFF_MAX, factor=self.BACKOFF_FACTOR)
         ws_params = {
             'initial': True,
         }
         while not self.is_closed():
             try:
-                coro: Coroutine = WebSocket.from_client(self, **ws_params)
-                self.ws = await asyncio.wait_for(coro, timeout=30.0)
+                if _HAS_TIMEOUT:
+                    async with asyncio.timeout(30.0):
+                        self.ws = await WebSocket.from_client(self, **ws_params)
+                else:
+                    self.ws = await asyncio.wait_for(WebSocket.from_client(self, **ws_params), timeout=30.0)
                 ws_params['initial'] = False
 
                 while True:
@@ -260,17 +299,27 @@ class _BaseClient:
         if self._closed:
             return
 
+        await self._shutdown_bg()
         await self.http.close()
         self._closed = True
 
         if self.ws is not None and self.ws.open:
             await self.ws.close(code=1000)
 
-        self._ready.clear()
+        if self._ready.done():
+            self._ready = self.loop.create_future()
 
     def is_ready(self):
         """:class:`bool`: Specifies if the client's internal cache is ready for use."""
-        return self._ready.is_set()
+        return self._ready.done()
+
+    async def _shutdown_bg(self):
+        # close() may itself run inside an event task, that one is left alone
+        current = asyncio.current_task()
+        tasks = [t for t in self._bg_tasks if t is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
 
     async def _run_event(self, coro, event_name, *args, **kwargs):
         try:
@@ -284,49 +333,52 @@ class _BaseClient:
                 pass
 
     def _schedule_event(self, coro, event_name, *args, **kwargs):
-        wrapped = self._run_event(coro, event_name, *args, **kwargs)
-        # Schedules the task
-        return _ClientEventTask(original_coro=coro, event_name=event_name, coro=wrapped, loop=self.loop)
+        # Plain loop tasks named after the event, an asyncio.Task subclass can't use the C task type
+        if self._default_on_error:
+            # The default on_error only prints, a done callback does that without a wrapper coroutine
+            task = self.loop.create_task(coro(*args, **kwargs), name=event_name)
+            task.add_done_callback(_print_event_exception)
+        else:
+            task = self.loop.create_task(self._run_event(coro, event_name, *args, **kwargs), name=event_name)
+        self._bg_tasks.add(task)
+        return task
 
     def dispatch(self, event, *args, **kwargs):
         log.debug('Dispatching event %s', event)
-        method = 'on_' + event
 
-        listeners = self._listeners.get(event)
-        if listeners:
-            removed = []
-            for i, (future, condition) in enumerate(listeners):
+        bucket = self._listeners.get(event) if self._listener_count else None
+        if bucket:
+            size = len(bucket)
+            args_len = len(args)
+            value = None if args_len == 0 else args[0] if args_len == 1 else args
+            pop = bucket.pop
+            for wid, (future, condition) in list(bucket.items()):
                 if future.cancelled():
-                    removed.append(i)
+                    pop(wid, None)
                     continue
 
                 try:
                     result = condition(*args)
                 except Exception as exc:
                     future.set_exception(exc)
-                    removed.append(i)
+                    pop(wid, None)
                 else:
                     if result:
-                        if len(args) == 0:
-                            future.set_result(None)
-                        elif len(args) == 1:
-                            future.set_result(args[0])
-                        else:
-                            future.set_result(args)
-                        removed.append(i)
-
-            if len(removed) == len(listeners):
-                self._listeners.pop(event)
-            else:
-                for idx in reversed(removed):
-                    del listeners[idx]
+                        future.set_result(value)
+                        pop(wid, None)
 
-        try:
-            coro = getattr(self, method)
-        except AttributeError:
-            pass
-        else:
-            self._schedule_event(coro, method, *args, **kwargs)
+            self._listener_count -= size - len(bucket)
+            if not bucket:
+                self._listeners.pop(event, None)
+
+        handler = self._event_handlers.get(event, _MISSING)
+        if handler is _MISSING:
+            method = 'on_' + event
+            coro = getattr(self, method, None)
+            handler = self._event_handlers[event] = None if coro is None else (coro, method)
+
+        if handler is not None:
+            self._schedule_event(handler[0], handler[1], *args, **kwargs)
 
     def is_closed(self):
         """:class:`bool`: Indicates if the websocket connection is closed."""
@@ -387,6 +439,9 @@ class _BaseClient:
         if kwargs:
             raise TypeError(f"unexpected keyword argument(s) {list(kwargs.keys())}")
 
+        # Everything allocated up to here lives as long as the client, moving it
+        # to the permanent generation keeps it out of every later collection.
+        gc.freeze()
         await self.connect(reconnect=reconnect)
 
     def run(self, *args, **kwargs):
@@ -415,11 +470,12 @@ class _BaseClient:
         """
         loop = self.loop
 
-        try:
-            loop.add_signal_handler(signal.SIGINT, lambda: loop.stop())
-            loop.add_signal_handler(signal.SIGTERM, lambda: loop.stop())
-        except NotImplementedError:
-            pass
+        stop = loop.stop
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop)
+            except NotImplementedError:
+                break
 
         async def runner():
             try:
@@ -429,7 +485,7 @@ class _BaseClient:
                     await self.close()
 
         def stop_loop_on_completion(f):
-            loop.stop()
+            stop()
 
         future = asyncio.ensure_future(runner(), loop=loop)
         future.add_done_callback(stop_loop_on_completion)
@@ -439,6 +495,11 @@ class _BaseClient:
             log.info('Received signal to terminate bot and event loop.')
         finally:
             future.remove_done_callback(stop_loop_on_completion)
+            if not future.done():
+                # The main task goes first, so runner() closes the client while
+                # the websocket and http tasks it awaits are still alive
+                future.cancel()
+                loop.run_until_complete(asyncio.wait((future,), timeout=CANCEL_TIMEOUT))
             log.info('Cleaning up tasks.')
             _cleanup_loop(loop)
 
@@ -454,7 +515,7 @@ class _BaseClient:
 
         Waits until the client's internal cache is all ready.
         """
-        await self._ready.wait()
+        await asyncio.shield(self._ready)
 
     def wait_for(self, event, *, check=None, timeout: Optional[Union[int, float]] = None):
         """|coro|
@@ -543,14 +604,8 @@ class _BaseClient:
                 return True
             check = _check
 
-        ev = event.lower()
-        try:
-            listeners = self._listeners[ev]
-        except KeyError:
-            listeners = []
-            self._listeners[ev] = listeners
-
-        listeners.append((future, check))
+        self._listeners[event.lower()][next(self._wait_counter)] = (future, check)
+        self._listener_count += 1
         return asyncio.wait_for(future, timeout)
 
     # event registration
@@ -581,6 +636,10 @@ class _BaseClient:
             raise TypeError('event registered must be a coroutine function')
 
         setattr(self, coro.__name__, coro)
+        if coro.__name__.startswith('on_'):
+            self._event_handlers.pop(coro.__name__[3:], None)
+            if coro.__name__ == 'on_error':
+                self._default_on_error = False
         log.debug(f'{ coro.__name__} has successfully been registered as an event')
         return coro
 
@@ -1,10 +1,14 @@
-import os
+from types import MappingProxyType
+
 from sockets.bitmex.gateway import WebSocket
-from sockets.binance.gateway import BinanceWebSocket
+from sockets.binance.gateway import WebSocket as BinanceWebSocket
 
-cwd = __file__.replace('/exchange.py', '')
 
-__all_as_strings__ = [p for p in os.listdir(cwd) if ('.' not in p) and ('_' not in p)]
+# exchange name -> (websocket class, base url)
+_EXCHANGES = MappingProxyType({
+    'bitmex': (WebSocket, 'wss://www.bitmex.com/realtimemd?heartbeat=true'),
+    'binance': (BinanceWebSocket, 'wss://stream.binance.com:9443'),
+})
 
 
 class Exchange:
@@ -12,9 +16,5 @@ class Exchange:
 
     def __init__(self, name: str):
         self.name = name
-        if self.name == 'bitmex':
-            self.socket_cls = WebSocket
-            self.base_url: str = 'wss://www.bitmex.com/realtimemd?heartbeat=true'
-        elif self.name == 'binance':
-            self.socket_cls = BinanceWebSocket
-            self.base_url: str = 'wss://stream.binance.com:9443'
+        # Unknown exchanges raise KeyError here instead of leaving the slots unset
+        self.socket_cls, self.base_url = _EXCHANGES[name]
@@ -1,79 +1,75 @@
-import threading
-import time
-import traceback
-import concurrent.futures
-from asyncio import run_coroutine_threadsafe
+from asyncio import TimeoutError, wait_for
 
 from logging import getLogger
-from sys import _current_frames
 
-from typing import Any
+from typing import Any, Optional
 
 
 log = getLogger(__name__)
 
 
-class KeepAliveHandler(threading.Thread):
-    def __init__(self, *args, **kwargs: Any):
-        ws = kwargs.get('ws', None)
-        interval = kwargs.pop('interval', None)
+class KeepAliveHandler:
+    """Sends a heartbeat every ``interval`` seconds from the websocket's own loop.
 
-        threading.Thread.__init__(self, *args, **kwargs)
+    Runs as timer callbacks on the loop, a heartbeat that can't be sent in time
+    means the loop itself is blocked, so there is no thread to watch it from.
+    """
+
+    def __init__(self, *, ws, interval: Optional[float] = None, **kwargs: Any):
         self.ws = ws
-        self._main_thread_id = ws.thread_id
+        self.loop = ws.loop
         self.interval = interval
-        self.daemon = True
         self.msg = 'Keeping websocket alive with sequence %s.'
         self.block_msg = 'heartbeat blocked for more than %s seconds.'
         self.behind_msg = 'Can\'t keep up, websocket is %.1fs behind.'
-        self._stop_ev = threading.Event()
-        self._last_ack = time.perf_counter()
-        self._last_send = time.perf_counter()
-        self._last_recv = time.perf_counter()
+        self._handle = None
+        self._stopped = False
+        # tick() runs for every received frame, so the clock is bound once
+        self._time = self.loop.time
+        now = self._time()
+        self._last_ack = now
+        self._last_send = now
+        self._last_recv = now
         self.latency = float('inf')
-        self.heartbeat_timeout = ws._max_heartbeat_timeout
-
-    def run(self):
-        while not self._stop_ev.wait(self.interval):
-            if self._last_recv + self.heartbeat_timeout < time.perf_counter():
-                log.warning("Shard ID %s has stopped responding to the gateway. Closing and restarting.")
-                coro = self.ws.close(4000)
-                f = run_coroutine_threadsafe(coro, loop=self.ws.loop)
-
-                try:
-                    f.result()
-                except Exception:
-                    log.exception('An error occurred while stopping the gateway. Ignoring.')
-                finally:
-                    self.stop()
-                    return
-
-            data = self.get_payload()
-            log.debug(self.msg, data['d'])
-            coro = self.ws.send_heartbeat(data)
-            f = run_coroutine_threadsafe(coro, loop=self.ws.loop)
-            try:
-                # block until sending is complete
-                total = 0
-                while True:
-                    try:
-                        f.result(10)
-                        break
-                    except concurrent.futures.TimeoutError:
-                        total += 10
-                        try:
-                            frame = _current_frames()[self._main_thread_id]
-                        except KeyError:
-                            msg = self.block_msg
-                        else:
-                            stack = traceback.format_stack(frame)
-                            msg = '%s\nLoop thread traceback (most recent call last):\n%s' % (self.block_msg, ''.join(stack))
-                        log.warning(msg, total)
 
+    @property
+    def heartbeat_timeout(self):
+        # Read from the socket, from_client sets it after the handler is created
+        return self.ws.max_heartbeat_timeout
+
+    def start(self):
+        if self.interval and not self._stopped:
+            self._handle = self.loop.call_later(self.interval, self._schedule_beat)
+
+    def _schedule_beat(self):
+        self.loop.create_task(self._beat())
+
+    async def _beat(self):
+        time = self._time
+        ws = self.ws
+        timeout = self.heartbeat_timeout
+
+        if timeout is not None and self._last_recv + timeout < time():
+            log.warning("Shard ID %s has stopped responding to the gateway. Closing and restarting.", ws.shard_id)
+            self.stop()
+            try:
+                await ws.close(4000)
             except Exception:
-                self.stop()
-            else:
-                self._last_send = time.perf_counter()
+                log.exception('An error occurred while stopping the gateway. Ignoring.')
+            return
+
+        data = self.get_payload()
+        log.debug(self.msg, data['d'])
+        try:
+            await wait_for(ws.send_heartbeat(data), timeout=timeout)
+        except TimeoutError:
+            log.warning(self.block_msg, timeout)
+            self.stop()
+        except Exception:
+            self.stop()
+        else:
+            self._last_send = time()
+            self.start()
 
     def get_payload(self):
         return {
@@ -82,15 +78,17 @@ class KeepAliveHandler(threading.Thread):
         }
 
     def stop(self):
-        self._stop_ev.set()
+        self._stopped = True
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
 
     def tick(self):
-        self._last_recv = time.perf_counter()
+        self._last_recv = self._time()
 
     def ack(self):
-        ack_time = time.perf_counter()
+        ack_time = self._time()
         self._last_ack = ack_time
         self.latency = ack_time - self._last_send
         if self.latency > 10:
             log.warning(self.behind_msg, self.latency)
-
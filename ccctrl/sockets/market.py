@@ -1,9 +1,32 @@
 
 
+# Separators exchanges put between base and quote, 'btc/usdt' and 'BTC-USDT' are both 'BTCUSDT'
+_SYMBOL_TBL = str.maketrans('', '', '/-_:')
+
+
 class Market:
 
-    __slots__ = ('_symbol_raw', '_symbol', '_exchange',)
+    __slots__ = ('_symbol_raw', '_symbol', '_exchange', '_key')
 
     def __init__(self, symbol, exchange):
         self._symbol_raw: str = symbol
+        self._symbol: str = symbol.translate(_SYMBOL_TBL).upper()
         self._exchange: str = exchange
+        self._key: tuple = (exchange, self._symbol)
+
+    @property
+    def symbol(self) -> str:
+        return self._symbol
+
+    @property
+    def exchange(self) -> str:
+        return self._exchange
+
+    def __eq__(self, other):
+        return isinstance(other, Market) and other._key == self._key
+
+    def __hash__(self):
+        return hash(self._key)
+
+    def __repr__(self):
+        return f'<Market {self._exchange} {self._symbol}>'
@@ -1,4 +1,4 @@
-import time
+from time import monotonic
 from asyncio import sleep, Lock
 from logging import getLogger
 
@@ -7,21 +7,23 @@ log = getLogger(__name__)
 
 class GatewayRatelimiter:
 
+    __slots__ = ('max', 'remaining', 'window', 'per', 'lock')
+
     def __init__(self, count=40, per=60*60):
-        self.max = count
-        self.remaining = count
-        self.window = 0.0
-        self.per = per
-        self.lock = Lock()
+        self.max: int = count
+        self.remaining: int = count
+        self.window: float = 0.0
+        self.per: float = per
+        self.lock: Lock = Lock()
 
     def is_ratelimited(self):
-        current = time.time()
+        current = monotonic()
         if current > self.window + self.per:
             return False
         return self.remaining == 0
 
     def get_delay(self):
-        current = time.time()
+        current = monotonic()
 
         if current > self.window + self.per:
             self.remaining = self.max
@@ -39,8 +41,14 @@ class GatewayRatelimiter:
         return 0.0
 
     async def block(self):
+        # A free token is taken without the lock, only senders that have to wait queue on it
+        if not self.get_delay():
+            return
+
         async with self.lock:
-            delta = self.get_delay()
-            if delta:
+            while True:
+                delta = self.get_delay()
+                if not delta:
+                    return
                 log.warning('WebSocket is ratelimited, waiting %.2f seconds', delta)
                 await sleep(delta)
@@ -1,18 +1,31 @@
+import asyncio
+import os
+from functools import partial
 from time import time_ns
+from timeit import Timer
 from dataclassy import dataclass
 from dataclassy.dataclass import DataClassMeta
 
 
+N = int(os.environ.get('CCCTRL_BENCH_N', 100_000))
+
+
 def timefunc(f):
-    def f_timer(*args, **kwargs):
+    # For the awaiting benchmarks, timeit can't drive a coroutine
+    async def f_timer(*args, **kwargs):
         start = time_ns()
-        result = f(*args, **kwargs)
+        result = await f(*args, **kwargs)
         end = time_ns()
         print(f.__name__, 'took', end - start, 'ns time')
         return result
     return f_timer
 
 
+def timeclass(name, cls):
+    took = Timer(partial(cls, 1)).timeit(number=N)
+    print(name, 'took', int(took * 1e9), 'ns time')
+
+
 class AsyncioMeta(DataClassMeta):
     async def __call__(cls, *args, **kwargs):
         return super(AsyncioMeta, cls).__call__(*args, **kwargs)
@@ -53,52 +66,48 @@ class ConnectionCountF:
     counter: int
 
 
-
-
-@timefunc
 def a():
-    for x in range(1000000):
-        y = ConnectionCountA(x)
-    return y
+    timeclass('a', ConnectionCountA)
 
 
-@timefunc
 def b():
-    for x in range(1000000):
-        y = ConnectionCountB(x)
+    timeclass('b', ConnectionCountB)
 
 
-@timefunc
 def c():
-    for x in range(1000000):
-        y = ConnectionCountC(x)
-    return y
+    timeclass('c', ConnectionCountC)
 
 
 @timefunc
 async def d():
-    for x in range(1000000):
+    for x in range(N):
         y = await ConnectionCountD(x)
     return y
 
 
 @timefunc
 async def e():
-    for x in range(1000000):
+    for x in range(N):
         y = await ConnectionCountE(x)
     return y
 
 
 @timefunc
 async def f():
-    for x in range(1000000):
+    for x in range(N):
         y = await ConnectionCountF(x)
     return y
 
-a()
-b()
-c()
-await d()
-await e()
-await f()
+
+async def _main():
+    await d()
+    await e()
+    await f()
+
+
+if __name__ == '__main__':
+    a()
+    b()
+    c()
+    asyncio.run(_main())
 